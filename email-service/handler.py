@@ -5,36 +5,86 @@ logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
 
+MAX_BATCH_SIZE = 100
+
+
 def send_email(event, context):
     """
     Entry point for email Lambda.
     """
     try:
-        body = json.loads(event.get("body", "{}"))
-        action = body.get("action")
+        body = json.loads(event.get("body") or "{}")
+        status, data = process_message(body)
+
+        if status != 200:
+            return error_response(status, data["error"])
+        return success_response(data)
+
+    except Exception as e:
+        logger.error(f"Email service error: {str(e)}")
+        return error_response(500, str(e))
 
-        if action == "SIGNUP_WELCOME":
-            return signup_welcome(body)
 
-        elif action == "BOOKING_CONFIRMATION":
-            return booking_confirmation(body)
+def send_emails(event, context):
+    """
+    Batch entry point: processes every message in one invocation and
+    reports a status per item, in request order.
+    """
+    try:
+        body = json.loads(event.get("body") or "{}")
+        messages = body.get("messages")
 
-        elif action == "BOOKING_CONFIRMATION_DOCTOR":
-            return booking_confirmation_doctor(body)
+        if not isinstance(messages, list):
+            return error_response(400, "'messages' must be a list")
 
-        elif action == "BOOKING_CANCELLED":
-            return booking_cancelled(body)
+        if len(messages) > MAX_BATCH_SIZE:
+            return error_response(
+                400, f"Batch too large: {len(messages)} > {MAX_BATCH_SIZE}"
+            )
 
-        elif action == "APPOINTMENT_REMINDER":
-            return appointment_reminder(body)
+        results = []
+        for index, message in enumerate(messages):
+            status, data = process_message(message)
+            results.append({"index": index, "status": status, **data})
 
-        return error_response(400, f"Unknown action: {action}")
+        sent = sum(1 for result in results if result["status"] == 200)
+
+        return success_response({
+            "results": results,
+            "sent": sent,
+            "failed": len(results) - sent,
+        })
 
     except Exception as e:
         logger.error(f"Email service error: {str(e)}")
         return error_response(500, str(e))
 
 
+def process_message(data):
+    """
+    Run the action for one message.
+    Returns (status_code, response_data).
+    """
+    if not isinstance(data, dict):
+        return 400, {"error": "Message must be an object"}
+
+    action = data.get("action")
+    handler = ACTIONS.get(action)
+
+    if handler is None:
+        return 400, {"error": f"Unknown action: {action}"}
+
+    try:
+        return 200, handler(data)
+
+    except ValueError as e:
+        return 400, {"error": str(e)}
+
+    except Exception as e:
+        logger.error(f"[{action}] failed: {str(e)}")
+        return 500, {"error": str(e)}
+
+
 # -----------------------
 # REQUIRED EMAIL ACTIONS
 # -----------------------
@@ -47,10 +97,10 @@ def signup_welcome(data):
         f"for role {data['role']}"
     )
 
-    return success_response({
+    return {
         "message": "Welcome email sent",
         "recipient": data["recipient_email"]
-    })
+    }
 
 
 def booking_confirmation(data):
@@ -65,10 +115,10 @@ def booking_confirmation(data):
         f"on {data['date']} at {data['time']}"
     )
 
-    return success_response({
+    return {
         "message": "Booking confirmation email sent",
         "recipient": data["recipient_email"]
-    })
+    }
 
 
 # -----------------------
@@ -86,10 +136,10 @@ def booking_confirmation_doctor(data):
         f"{data['recipient_email']} for patient {data['patient_name']}"
     )
 
-    return success_response({
+    return {
         "message": "Booking notification sent to doctor",
         "recipient": data["recipient_email"]
-    })
+    }
 
 
 def booking_cancelled(data):
@@ -103,10 +153,10 @@ def booking_cancelled(data):
         f"for cancelled appointment with {data['doctor_name']}"
     )
 
-    return success_response({
+    return {
         "message": "Cancellation email sent",
         "recipient": data["recipient_email"]
-    })
+    }
 
 
 def appointment_reminder(data):
@@ -120,10 +170,23 @@ def appointment_reminder(data):
         f"for appointment with {data['doctor_name']} in {data['hours_before']} hours"
     )
 
-    return success_response({
+    return {
         "message": "Appointment reminder email sent",
         "recipient": data["recipient_email"]
-    })
+    }
+
+
+# -----------------------
+# ACTION REGISTRY
+# -----------------------
+
+ACTIONS = {
+    "SIGNUP_WELCOME": signup_welcome,
+    "BOOKING_CONFIRMATION": booking_confirmation,
+    "BOOKING_CONFIRMATION_DOCTOR": booking_confirmation_doctor,
+    "BOOKING_CANCELLED": booking_cancelled,
+    "APPOINTMENT_REMINDER": appointment_reminder,
+}
 
 
 # -----------------------
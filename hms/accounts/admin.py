@@ -1,7 +1,9 @@
 """Admin configuration for accounts app."""
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from doctors.stats import DoctorStats
 from .models import CustomUser
+from .paginators import EstimatedCountPaginator
 
 
 @admin.register(CustomUser)
@@ -9,9 +11,24 @@ class CustomUserAdmin(UserAdmin):
     """Admin for CustomUser model."""
     
     fieldsets = UserAdmin.fieldsets + (
-        ('Custom Fields', {'fields': ('role', 'google_calendar_token')}),
+        ('Custom Fields', {'fields': ('role', 'google_calendar_token', 'doctor_stats')}),
     )
+    readonly_fields = ('doctor_stats',)
     list_display = ('email', 'first_name', 'last_name', 'role')
     list_filter = ('role', 'is_staff', 'is_active')
     search_fields = ('email', 'first_name', 'last_name')
     ordering = ('-date_joined',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    
+    @admin.display(description='Doctor statistics')
+    def doctor_stats(self, obj):
+        """Slot and booking counts for doctors (one aggregate query)."""
+        if not obj.pk or not obj.is_doctor():
+            return '-'
+        stats = DoctorStats.for_doctor(obj)
+        return (
+            f"{stats['slots_count']} slots "
+            f"({stats['booked_slots_count']} booked, {stats['available_slots_count']} available), "
+            f"{stats['total_bookings']} bookings"
+        )
@@ -6,3 +6,7 @@ class AccountsConfig(AppConfig):
     """Configuration for accounts app."""
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+    
+    def ready(self):
+        """Connect signal handlers."""
+        from . import signals  # noqa: F401
@@ -0,0 +1,66 @@
+"""Authentication backend that serves ``request.user`` from the cache."""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from .models import CustomUser
+
+
+def user_cache_key(user_id):
+    return f"user:{user_id}"
+
+
+def invalidate_cached_user(user_id):
+    """Drop the cached copy of a user once the current transaction commits."""
+    key = user_cache_key(user_id)
+    transaction.on_commit(lambda: caches[settings.USER_CACHE_ALIAS].delete(key))
+
+
+class CachedModelBackend(ModelBackend):
+    """``ModelBackend`` whose ``get_user`` reads a cached snapshot of the user.
+    
+    Django calls ``get_user`` on every request with a logged-in session.
+    The snapshot holds ``SNAPSHOT_FIELDS`` (role and names for the views,
+    the flags for permission checks, the password hash for the session
+    check) and whether Google Calendar is connected; the token and every
+    other column are deferred and loaded on first access. The snapshot is
+    dropped whenever the user is saved or deleted (accounts/signals.py) and
+    expires after ``USER_CACHE_TIMEOUT``. Queryset ``update()`` calls on
+    users must call ``invalidate_cached_user`` themselves.
+    """
+    
+    SNAPSHOT_FIELDS = (
+        'id', 'password', 'username', 'email', 'first_name', 'last_name',
+        'role', 'is_active', 'is_staff', 'is_superuser',
+    )
+    
+    def get_user(self, user_id):
+        """Return the active user with ``user_id`` or None."""
+        cache = caches[settings.USER_CACHE_ALIAS]
+        key = user_cache_key(user_id)
+        
+        values = cache.get(key)
+        if values is None or values.keys() != {*self.SNAPSHOT_FIELDS, 'google_calendar_connected'}:
+            # Miss, or cached before the snapshot changed
+            user = self.load_user(user_id)
+            if user is None:
+                return None
+            values = {name: getattr(user, name) for name in self.SNAPSHOT_FIELDS}
+            values['google_calendar_connected'] = user.google_calendar_connected
+            cache.set(key, values, settings.USER_CACHE_TIMEOUT)
+        
+        # from_db expects the loaded fields in model order
+        fields = [
+            field.attname for field in CustomUser._meta.concrete_fields
+            if field.attname in self.SNAPSHOT_FIELDS
+        ]
+        user = CustomUser.from_db(DEFAULT_DB_ALIAS, fields, [values[name] for name in fields])
+        user._google_calendar_connected = values['google_calendar_connected']
+        return user if self.user_can_authenticate(user) else None
+    
+    def load_user(self, user_id):
+        """The snapshot columns of ``user_id``, plus whether a token is stored."""
+        return CustomUser._default_manager.only(*self.SNAPSHOT_FIELDS).annotate(
+            google_calendar_connected=Q(google_calendar_token__isnull=False),
+        ).filter(pk=user_id).first()
@@ -0,0 +1,38 @@
+"""View decorators for async views.
+
+Django 4.2's ``login_required`` and ``require_http_methods`` only wrap sync
+views, and touching the lazy ``request.user`` inside the event loop raises
+``SynchronousOnlyOperation``. These versions await the wrapped view and
+load the user in a worker thread first.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
+
+
+def async_login_required(login_url=None):
+    """Async ``login_required``; leaves the loaded user on ``request.user``."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            request.user = await sync_to_async(get_user)(request)
+            if not request.user.is_authenticated:
+                return redirect_to_login(request.get_full_path(), login_url)
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def async_require_http_methods(methods):
+    """Async ``require_http_methods``."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return HttpResponseNotAllowed(methods)
+            return await view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
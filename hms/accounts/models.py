@@ -28,6 +28,10 @@ class CustomUser(AbstractUser):
         db_table = 'accounts_customuser'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(fields=['role'], name='user_role_idx'),
+            models.Index(fields=['-date_joined'], name='user_date_joined_idx'),
+        ]
     
     def __str__(self):
         """String representation."""
@@ -40,3 +44,14 @@ class CustomUser(AbstractUser):
     def is_patient(self):
         """Check if user is a patient."""
         return self.role == 'PATIENT'
+    
+    def has_google_calendar(self):
+        """Check if user has connected Google Calendar.
+        
+        Users served from the user cache carry this as a flag, so the
+        token itself is only loaded when it is used.
+        """
+        connected = getattr(self, '_google_calendar_connected', None)
+        if connected is None:
+            connected = bool(self.google_calendar_token)
+        return connected
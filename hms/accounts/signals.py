@@ -0,0 +1,11 @@
+"""Signal handlers for accounts app."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .backends import invalidate_cached_user
+from .models import CustomUser
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def drop_cached_user(sender, instance, **kwargs):
+    """Keep the user cache used by CachedModelBackend in step with the row."""
+    invalidate_cached_user(instance.pk)
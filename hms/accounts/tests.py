@@ -0,0 +1,51 @@
+"""Tests for accounts app."""
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase
+from .backends import CachedModelBackend, user_cache_key
+from .models import CustomUser
+
+GOOGLE_TOKEN = {'token': 'access', 'refresh_token': 'refresh', 'client_secret': 'secret'}
+
+
+class CachedUserTests(TestCase):
+    """``CachedModelBackend`` caches a snapshot, not the whole row."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR',
+            first_name='Ada', google_calendar_token=GOOGLE_TOKEN,
+        )
+    
+    def setUp(self):
+        self.cache = caches[settings.USER_CACHE_ALIAS]
+        self.cache.clear()
+        self.backend = CachedModelBackend()
+    
+    def test_snapshot_has_no_token(self):
+        """The Google token is neither cached nor loaded for each request."""
+        self.backend.get_user(self.doctor.id)
+    
+        values = self.cache.get(user_cache_key(self.doctor.id))
+        self.assertNotIn('google_calendar_token', values)
+        self.assertNotIn('secret', repr(values))
+        self.assertTrue(values['google_calendar_connected'])
+    
+    def test_cached_user(self):
+        """A cached user needs no queries until the token is used."""
+        self.backend.get_user(self.doctor.id)
+    
+        with self.assertNumQueries(0):
+            user = self.backend.get_user(self.doctor.id)
+            self.assertEqual((user.pk, user.role, user.first_name), (self.doctor.pk, 'DOCTOR', 'Ada'))
+            self.assertTrue(user.has_google_calendar())
+            self.assertEqual(user.get_session_auth_hash(), self.doctor.get_session_auth_hash())
+    
+        with self.assertNumQueries(1):
+            self.assertEqual(user.google_calendar_token, GOOGLE_TOKEN)
+    
+    def test_inactive_user(self):
+        CustomUser.objects.filter(pk=self.doctor.pk).update(is_active=False)
+    
+        self.assertIsNone(self.backend.get_user(self.doctor.id))
@@ -4,10 +4,11 @@ from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from django.db import transaction
 import os
 from .forms import DoctorSignUpForm, PatientSignUpForm, CustomAuthenticationForm
 from services.google_calendar import get_google_auth_url, handle_oauth_callback
-from services.email_client import send_signup_welcome
+from bookings.outbox import enqueue_signup_welcome
 from accounts.models import CustomUser
 
 
@@ -32,11 +33,9 @@ def doctor_signup(request):
     if request.method == 'POST':
         form = DoctorSignUpForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            try:
-                send_signup_welcome(user)
-            except Exception as e:
-                pass
+            with transaction.atomic():
+                user = form.save()
+                enqueue_signup_welcome(user)
             login(request, user)
             return redirect('dashboard')
     else:
@@ -54,11 +53,9 @@ def patient_signup(request):
     if request.method == 'POST':
         form = PatientSignUpForm(request.POST)
         if form.is_valid():
-            user = form.save()
-            try:
-                send_signup_welcome(user)
-            except Exception as e:
-                pass
+            with transaction.atomic():
+                user = form.save()
+                enqueue_signup_welcome(user)
             login(request, user)
             return redirect('dashboard')
     else:
@@ -0,0 +1 @@
+"""Load-test harness for MediFlow. Run with ``python -m benchmarks.run``."""
@@ -0,0 +1,42 @@
+"""Throwaway database and local service stubs shared by the benchmark tools."""
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def benchmark_environment(keepdb=False, email_latency=0.0, engine=None):
+    """Configure Django against local stubs and a test database.
+
+    Must be entered before Django is set up, because settings read the
+    stub addresses from the environment at import time. Yields the running
+    ``EmailStubServer``.
+    """
+    from .stubs import EmailStubServer
+    email_stub = EmailStubServer(latency=email_latency).start()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    os.environ['EMAIL_SERVICE_URL'] = email_stub.url
+    os.environ['GOOGLE_CALENDAR_HTTP_FACTORY'] = 'services.fake_calendar.FakeCalendarHttp'
+    os.environ.setdefault('REQUEST_LOG_LEVEL', 'WARNING')
+    if engine:
+        os.environ['BOOKING_ENGINE'] = engine
+
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.test.utils import setup_databases, setup_test_environment, teardown_databases
+
+    database = settings.DATABASES['default']
+    if database['ENGINE'].endswith('sqlite3'):
+        # A file, so every client thread shares it; in-memory would not.
+        database.setdefault('TEST', {})['NAME'] = os.path.join(tempfile.gettempdir(), 'hms_benchmark.sqlite3')
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False, keepdb=keepdb)
+    try:
+        yield email_stub
+    finally:
+        teardown_databases(old_config, verbosity=0, keepdb=keepdb)
+        email_stub.stop()
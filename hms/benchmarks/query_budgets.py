@@ -0,0 +1,295 @@
+"""N+1 guard: every view and batch job must issue a bounded number of queries.
+
+Usage (from the ``hms`` directory)::
+
+    python -m benchmarks.query_budgets --sizes 10 1000
+
+``python manage.py test benchmarks`` runs the same cases at 10 and 100 rows
+as part of the test suite (benchmarks/tests.py).
+
+The database is seeded once per size, with that many rows behind every
+list (doctors, slots, bookings, outbox messages, calendar events). Each
+case then runs in a rolled-back transaction while its queries are counted.
+The run fails if a case issues more queries at a larger size than at the
+smallest one, if it exceeds its budget, or if a URL in the checked apps
+or a registered admin model has no case at all.
+"""
+import argparse
+import sys
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+# path: URL or callable(fixtures) -> URL; run: callable(fixtures) for non-HTTP cases
+Case = namedtuple('Case', 'name role method path data budget run', defaults=(None, None, None))
+
+CHECKED_URLCONFS = ('accounts.urls', 'doctors.urls', 'patients.urls', 'bookings.urls')
+
+
+class Rollback(Exception):
+    pass
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000])
+    parser.add_argument('--keepdb', action='store_true')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Print the SQL of failing cases')
+    return parser.parse_args(argv)
+
+
+def cases():
+    """Every checked view, admin changelist and batch job, with its budget."""
+    from django.contrib import admin
+    from django.urls import reverse
+
+    def future():
+        return _localdate() + timedelta(days=400)
+
+    result = [
+        # accounts
+        Case('home', None, 'get', '/', budget=0),
+        Case('doctor_signup', None, 'get', reverse('doctor_signup'), budget=0),
+        Case('patient_signup', None, 'get', reverse('patient_signup'), budget=0),
+        Case('login', None, 'get', reverse('login'), budget=0),
+        Case('logout', 'doctor', 'post', reverse('logout'), budget=4),
+        Case('dashboard', 'doctor', 'get', reverse('dashboard'), budget=2),
+        Case('google_calendar_connect', 'doctor', 'get', reverse('google_calendar_connect'), budget=5),
+        # doctors
+        Case('doctor_dashboard', 'doctor', 'get', reverse('doctor_dashboard'), budget=4),
+        Case('create_availability', 'doctor', 'get', reverse('create_availability'), budget=2),
+        Case('create_availability (POST)', 'doctor', 'post', reverse('create_availability'), budget=5,
+             data=lambda f: {'date': future(), 'start_time': '09:00', 'end_time': '09:30'}),
+        Case('create_recurring_availability', 'doctor', 'get', reverse('create_recurring_availability'), budget=2),
+        # The bulk insert is bracketed by two counts to report only new slots.
+        Case('create_recurring_availability (POST)', 'doctor', 'post', reverse('create_recurring_availability'),
+             budget=8, data=lambda f: {
+                 'date_from': future(), 'date_to': future() + timedelta(days=6),
+                 'weekdays': ['0', '1', '2', '3', '4'], 'start_time': '09:00', 'end_time': '12:00',
+                 'slot_minutes': 30, 'exclusions': '',
+             }),
+        Case('manage_availability', 'doctor', 'get', reverse('manage_availability'), budget=3),
+        Case('delete_availability', 'doctor', 'post',
+             lambda f: reverse('delete_availability', args=[f['free_slot'].id]), budget=6),
+        Case('doctor_view_bookings', 'doctor', 'get', reverse('doctor_view_bookings'), budget=3),
+        # patients
+        Case('patient_dashboard', 'booked_patient', 'get', reverse('patient_dashboard'), budget=4),
+        Case('view_doctors', 'patient', 'get', reverse('view_doctors'), budget=3),
+        Case('view_slots', 'patient', 'get', reverse('view_slots'), budget=3),
+        Case('view_doctor_slots', 'patient', 'get',
+             lambda f: reverse('view_doctor_slots', args=[f['doctor'].id]), budget=3),
+        Case('api_available_slots', 'patient', 'get', reverse('api_available_slots'), budget=3),
+        # Only opens the stream; events are not read.
+        Case('slot_events', 'patient', 'get', reverse('slot_events'), budget=3),
+        Case('api_earliest_slots', 'patient', 'get', reverse('api_earliest_slots') + '?per_doctor=1', budget=3),
+        # bookings
+        Case('book_appointment', 'patient', 'post',
+             lambda f: reverse('book_appointment', args=[f['free_slot'].id]), budget=10),
+        # Hands the slot to the first of ``size`` waitlisted patients.
+        Case('cancel_booking', 'booked_patient', 'post', reverse('cancel_booking'), budget=14),
+        Case('join_waitlist', 'patient', 'post', reverse('join_waitlist'), budget=8,
+             data=lambda f: {'doctor': f['doctor'].id, 'date': future()}),
+        Case('leave_waitlist', 'patient', 'post',
+             lambda f: reverse('leave_waitlist', args=[f['waitlist_entry'].id]), budget=4),
+        # batch jobs
+        Case('send_appointment_reminders', None, None, None, budget=6, run=_run_reminders),
+        Case('process_outbox (one batch)', None, None, None, budget=8, run=_run_outbox_batch),
+    ]
+
+    for model in admin.site._registry:
+        opts = model._meta
+        result.append(Case(
+            f'admin {opts.app_label}.{opts.model_name} changelist', 'admin', 'get',
+            reverse(f'admin:{opts.app_label}_{opts.model_name}_changelist'), budget=10,
+        ))
+    return result
+
+
+def uncovered(case_list):
+    """Named URLs of the checked apps and admin changelists without a case."""
+    from importlib import import_module
+    from django.contrib import admin
+
+    names = {case.name.split(' ')[0] for case in case_list}
+    missing = [
+        pattern.name
+        for urlconf in CHECKED_URLCONFS
+        for pattern in import_module(urlconf).urlpatterns
+        if pattern.name and pattern.name not in names
+    ]
+    admin_cases = {case.name for case in case_list if case.role == 'admin'}
+    for model in admin.site._registry:
+        name = f'admin {model._meta.app_label}.{model._meta.model_name} changelist'
+        if name not in admin_cases:
+            missing.append(name)
+    return missing
+
+
+def _localdate():
+    from django.utils import timezone
+    return timezone.localdate()
+
+
+def _run_reminders(fixtures):
+    from io import StringIO
+    from django.core.management import call_command
+    # One chunk at every size, so only per-row queries can grow.
+    call_command('send_appointment_reminders', type='all', batch_size=100000, stdout=StringIO())
+
+
+def _run_outbox_batch(fixtures):
+    from bookings.outbox import process_batch
+    process_batch()
+
+
+def seed(size):
+    """Seed ``size`` rows behind every list; returns the fixture users and slots."""
+    from accounts.models import CustomUser
+    from bookings.models import Booking, CalendarEvent, OutboxMessage, WaitlistEntry
+    from doctors.models import AvailabilitySlot
+    from .seed import book_directly, make_slots, make_users
+
+    doctor = CustomUser.objects.create_user(username='qb-doctor', email='qb-doctor@bench.local', role='DOCTOR')
+    fixtures = {
+        'admin': CustomUser.objects.create_superuser(username='qb-admin', email='qb-admin@bench.local', password='!'),
+        'doctor': doctor,
+        'patient': CustomUser.objects.create_user(username='qb-patient', email='qb-patient@bench.local', role='PATIENT'),
+        'booked_patient': CustomUser.objects.create_user(
+            username='qb-booked', email='qb-booked@bench.local', role='PATIENT'
+        ),
+    }
+
+    make_users('DOCTOR', size, 'doctor')
+    patients = make_users('PATIENT', size, 'patient') + [fixtures['booked_patient']]
+
+    make_slots([doctor], 2 * len(patients), _localdate() + timedelta(days=2))
+    slots = list(AvailabilitySlot.objects.filter(doctor=doctor).order_by('starts_at'))
+    booked, fixtures['free_slot'] = slots[:len(patients)], slots[-1]
+    book_directly(patients, booked)
+
+    # Move the booked slots to tomorrow, one minute apart, so every booking
+    # is due a 24h reminder.
+    tomorrow = datetime.combine(_localdate() + timedelta(days=1), time(0))
+    for i, slot in enumerate(booked):
+        start = tomorrow + timedelta(minutes=i)
+        slot.date, slot.start_time = start.date(), start.time()
+        slot.end_time = (start + timedelta(minutes=1)).time()
+        slot.sync_datetimes()
+    AvailabilitySlot.objects.bulk_update(
+        booked, ['date', 'start_time', 'end_time', 'starts_at', 'ends_at'], batch_size=500
+    )
+
+    # Everyone waiting for the booked patient's slot, which is tomorrow.
+    WaitlistEntry.objects.bulk_create([
+        WaitlistEntry(patient=patient, doctor=doctor, date=tomorrow.date())
+        for patient in make_users('PATIENT', size, 'waiting')
+    ])
+    fixtures['waitlist_entry'] = WaitlistEntry.objects.create(
+        patient=fixtures['patient'], doctor=doctor, date=_localdate() + timedelta(days=2)
+    )
+
+    OutboxMessage.objects.bulk_create([
+        OutboxMessage(kind='EMAIL', payload={
+            'action': 'SIGNUP_WELCOME', 'recipient_email': f'patient{i}@bench.local',
+            'recipient_name': f'Patient {i}', 'role': 'Patient',
+        })
+        for i in range(size)
+    ])
+    CalendarEvent.objects.bulk_create([
+        CalendarEvent(user_id=patient_id, booking_id=booking_id, event_id=f'seed{booking_id}')
+        for booking_id, patient_id in Booking.objects.values_list('id', 'patient_id')
+    ])
+    return fixtures
+
+
+def measure(case, fixtures):
+    """Run ``case`` in a rolled-back transaction; returns the captured queries."""
+    from django.core.cache import cache
+    from django.db import connection, transaction
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+
+    client = Client()
+    if case.role:
+        client.force_login(fixtures[case.role])
+    cache.clear()
+
+    path = case.path(fixtures) if callable(case.path) else case.path
+    data = case.data(fixtures) if callable(case.data) else case.data
+
+    try:
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as captured:
+                if case.run:
+                    case.run(fixtures)
+                else:
+                    response = getattr(client, case.method)(path, data or {})
+                    if response.status_code >= 400:
+                        raise RuntimeError(f'{case.name}: HTTP {response.status_code}')
+            raise Rollback
+    except Rollback:
+        pass
+    return captured.captured_queries
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = sorted(set(args.sizes))
+
+    from .environment import benchmark_environment
+    with benchmark_environment(args.keepdb):
+        from django.core.management import call_command
+
+        case_list = cases()
+        counts = {case.name: {} for case in case_list}
+        queries = {}
+        for size in sizes:
+            call_command('flush', interactive=False, verbosity=0)
+            fixtures = seed(size)
+            for case in case_list:
+                captured = measure(case, fixtures)
+                counts[case.name][size] = len(captured)
+                queries[(case.name, size)] = captured
+
+        failures = report(case_list, counts, sizes, queries, args.verbose)
+        missing = uncovered(case_list)
+
+    for name in missing:
+        print(f'NO CASE  {name}')
+    if failures or missing:
+        sys.exit(1)
+
+
+def problems(case, by_size):
+    """What is wrong with ``case``'s query counts, as ``{size: count}``."""
+    sizes = sorted(by_size)
+    found = []
+    if by_size[sizes[-1]] > by_size[sizes[0]]:
+        found.append('grows with data')
+    if max(by_size.values()) > case.budget:
+        found.append('over budget')
+    return found
+
+
+def report(case_list, counts, sizes, queries, verbose=False):
+    """Print one line per case; returns the number of failing cases."""
+    failures = 0
+    header = ' '.join(f'{size:>6}' for size in sizes)
+    print(f"{'case':<48} {header} budget")
+    for case in case_list:
+        by_size = counts[case.name]
+        found = problems(case, by_size)
+
+        status = 'FAIL ' + ', '.join(found) if found else 'ok'
+        columns = ' '.join(f'{by_size[size]:>6}' for size in sizes)
+        print(f'{case.name:<48} {columns} {case.budget:>6}  {status}')
+
+        if found:
+            failures += 1
+            if verbose:
+                for query in queries[(case.name, sizes[-1])]:
+                    print(f"    {query['sql'][:200]}")
+    return failures
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Per-request cost of the rate limiter.
+
+Usage (from the ``hms`` directory)::
+
+    python -m benchmarks.ratelimit --iterations 200000 --max-us 5
+
+Times ``RateLimitMiddleware.process_view`` in isolation, without the rest
+of the request, for:
+
+- a URL without a rule (almost every request);
+- a limited URL with buckets in process memory;
+- a limited URL with buckets in the configured Django cache.
+
+Clients are spread over many IPs so buckets never run dry and every call
+takes the normal "allowed" path. Exits non-zero if the unlimited path, the
+in-memory path (the fallback) or the path selected by
+``RATE_LIMIT_BACKEND`` costs more than ``--max-us`` microseconds per
+request; the cache path is only reported when it is not the configured one.
+"""
+import argparse
+import os
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--iterations', type=int, default=200000)
+    parser.add_argument('--clients', type=int, default=1000, help='Distinct client IPs')
+    parser.add_argument('--max-us', type=float, default=5.0)
+    return parser.parse_args(argv)
+
+
+def per_call_us(func, requests, iterations):
+    count = len(requests)
+    started = time.perf_counter()
+    for i in range(iterations):
+        func(requests[i % count])
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+def make_requests(url_name, clients):
+    from django.test import RequestFactory
+    from django.urls import ResolverMatch
+
+    factory = RequestFactory()
+    requests = []
+    for i in range(clients):
+        request = factory.post('/', REMOTE_ADDR=f'10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}')
+        request.resolver_match = ResolverMatch(lambda r: None, (), {}, url_name=url_name)
+        requests.append(request)
+    return requests
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.test import override_settings
+    from config.middleware import RateLimitMiddleware
+    from services import ratelimit
+
+    limits = {'bench': {'rate': '1000000/s', 'key': 'ip'}}
+    middleware = RateLimitMiddleware(lambda request: None)
+
+    def process(request):
+        return middleware.process_view(request, None, (), {})
+
+    configured = settings.RATE_LIMIT_BACKEND
+    cases = [
+        ('no rule', 'home', configured, True),
+        ('memory buckets', 'bench', 'memory', True),
+        ('cache buckets', 'bench', 'cache', configured == 'cache'),
+    ]
+    failures = 0
+    print(f"RATE_LIMIT_BACKEND = {configured!r}")
+    print(f"{'case':<16} {'us/request':>10}")
+    for name, url_name, backend, checked in cases:
+        with override_settings(RATE_LIMITS=limits, RATE_LIMIT_BACKEND=backend, RATE_LIMIT_ENABLED=True):
+            ratelimit.reset()
+            requests = make_requests(url_name, args.clients)
+            # Warm up: create every bucket once.
+            per_call_us(process, requests, len(requests))
+            us = per_call_us(process, requests, args.iterations)
+            blocked = sum(process(request) is not None for request in requests)
+        ratelimit.reset()
+
+        status = ''
+        if blocked:
+            status = f'FAIL {blocked} requests blocked'
+            failures += 1
+        elif checked and us > args.max_us:
+            status = f'FAIL over {args.max_us} us'
+            failures += 1
+        print(f"{name:<16} {us:>10.2f}  {status}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
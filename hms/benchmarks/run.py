@@ -0,0 +1,115 @@
+"""Run the benchmark suite against a throwaway database.
+
+Usage (from the ``hms`` directory)::
+
+    python -m benchmarks.run --doctors 50 --slots 200 --patients 3000
+
+The database configured in settings is not touched: a test database is
+created (an SQLite file under the temp dir for SQLite) and dropped again
+unless ``--keepdb`` is given. Email goes to a local stub server and Google
+Calendar to ``services.fake_calendar``. Exits non-zero if any request
+failed unexpectedly (outcomes starting with ``ERROR`` or ``MISMATCH``).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--doctors', type=int, default=20)
+    parser.add_argument('--slots', type=int, default=100, help='Slots per doctor')
+    parser.add_argument('--patients', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=8, help='Concurrent client threads')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per read scenario')
+    parser.add_argument('--max-pages', type=int, default=3, help='Deepest slot-list page walked')
+    parser.add_argument('--hot-slots', type=int, default=5)
+    parser.add_argument('--bookers', type=int, default=200, help='Patients per booking scenario')
+    parser.add_argument('--reminders', type=int, default=200, help='Bookings due a 24h reminder')
+    parser.add_argument('--engine', choices=['locking', 'optimistic'], help='Override BOOKING_ENGINE')
+    parser.add_argument('--email-latency-ms', type=float, default=0.0)
+    parser.add_argument('--keepdb', action='store_true')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed')
+    parser.add_argument('--json', metavar='PATH', help='Also write the results as JSON')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    needed = 2 * args.bookers + args.reminders
+    if args.patients < needed:
+        sys.exit(f'--patients must be at least 2 * --bookers + --reminders ({needed})')
+    # Reminder bookings, hot slots and spread bookings each need their own slots.
+    needed = args.reminders + args.hot_slots + args.bookers
+    if args.doctors * args.slots < needed:
+        sys.exit(f'--doctors * --slots must be at least --reminders + --hot-slots + --bookers ({needed})')
+    random.seed(args.seed)
+
+    from .environment import benchmark_environment
+    with benchmark_environment(args.keepdb, args.email_latency_ms / 1000, args.engine) as email_stub:
+        results = run_scenarios(args, email_stub)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    from .stats import failures
+    failed = {summary['name']: failures(summary) for summary in results if failures(summary)}
+    if failed:
+        sys.exit(f'Unexpected failures: {failed}')
+
+
+def run_scenarios(args, email_stub):
+    from datetime import timedelta
+    from django.utils import timezone
+    from doctors.models import AvailabilitySlot
+    from . import scenarios
+    from .seed import book_directly, seed
+    from .stats import format_summary
+
+    started = time.perf_counter()
+    doctors, patients = seed(args.doctors, args.slots, args.patients)
+    seed_seconds = time.perf_counter() - started
+    print(f"seeded {args.doctors} doctors x {args.slots} slots, {args.patients} patients in {seed_seconds:.1f}s")
+
+    for doctor in doctors:
+        doctor.google_calendar_token = {
+            'token': 'bench', 'refresh_token': 'bench', 'token_uri': 'https://oauth2.googleapis.com/token',
+            'client_id': 'bench', 'client_secret': 'bench', 'scopes': [], 'expiry': '2999-01-01T00:00:00',
+        }
+    type(doctors[0]).objects.bulk_update(doctors, ['google_calendar_token'])
+
+    hot_bookers = patients[:args.bookers]
+    spread_bookers = patients[args.bookers:2 * args.bookers]
+    reminded = patients[2 * args.bookers:2 * args.bookers + args.reminders]
+
+    # Tomorrow's slots are due a 24h reminder when the job runs.
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    tomorrow = list(AvailabilitySlot.objects.filter(date=tomorrow).order_by('id')[:len(reminded)])
+    if len(tomorrow) < len(reminded):
+        sys.exit(f'Only {len(tomorrow)} slots start tomorrow; lower --reminders or add --doctors')
+    book_directly(reminded, tomorrow)
+
+    free = AvailabilitySlot.objects.filter(is_booked=False)
+    hot_slots = list(free.order_by('?')[:args.hot_slots])
+
+    results = []
+    for group in (
+        scenarios.slot_browsing(patients, doctors, args.requests, args.workers, args.max_pages),
+        scenarios.dashboards(doctors, args.requests, args.workers),
+        scenarios.booking_contention(hot_bookers, hot_slots, args.workers),
+        scenarios.booking_spread(spread_bookers, args.workers),
+        scenarios.outbox_drain(email_stub),
+        scenarios.reminders(email_stub),
+    ):
+        for samples in group:
+            summary = samples.summary()
+            print(format_summary(summary))
+            results.append(summary)
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Benchmark scenarios. Each returns a list of ``Samples``.
+
+Requests go through the full middleware stack with Django's test
+``Client``, one client per worker thread, so latencies include session
+loading, view code, queries and template rendering but not a network hop.
+"""
+import queue
+import random
+import threading
+import time
+from io import StringIO
+
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+
+from bookings.models import Booking
+from bookings.outbox import process_batch
+from doctors.models import AvailabilitySlot
+from services import fake_calendar
+from .stats import Samples
+
+
+def run_concurrently(tasks, workers, work):
+    """Call ``work(task, state)`` for every task on ``workers`` threads.
+
+    ``state`` is a per-thread dict (e.g. for a logged-in client). Returns
+    the wall-clock seconds taken.
+    """
+    pending = queue.Queue()
+    for task in tasks:
+        pending.put(task)
+
+    def worker():
+        state = {}
+        try:
+            while True:
+                try:
+                    task = pending.get_nowait()
+                except queue.Empty:
+                    return
+                work(task, state)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(max(1, workers))]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+def logged_in_client(state, user):
+    client = state.get('client')
+    if client is None or state.get('user') != user.id:
+        client = Client()
+        client.force_login(user)
+        state['client'], state['user'] = client, user.id
+    return client
+
+
+def slot_browsing(patients, doctors, requests, workers, max_pages):
+    """Walk the slot list, sometimes filtered by doctor, several pages deep."""
+    samples = Samples('slot list')
+    url = reverse('view_slots')
+
+    def work(_, state):
+        client = logged_in_client(state, state.setdefault('patient', random.choice(patients)))
+        query = f"doctor={random.choice(doctors).id}" if random.random() < 0.5 else ''
+        for _ in range(random.randint(1, max_pages)):
+            with samples.measure() as result:
+                response = client.get(f"{url}?{query}")
+                if response.status_code != 200:
+                    result['outcome'] = f'ERROR http_{response.status_code}'
+            query = response.context['next_query'] if response.context else None
+            if not query:
+                break
+
+    samples.elapsed = run_concurrently(range(requests), workers, work)
+    return [samples]
+
+
+def dashboards(doctors, requests, workers):
+    """Doctor dashboard with an empty cache, then warm."""
+    url = reverse('doctor_dashboard')
+    cold = Samples('doctor dashboard (cold)')
+    warm = Samples('doctor dashboard (warm)')
+
+    def work(doctor, state, samples):
+        client = logged_in_client(state, doctor)
+        with samples.measure() as result:
+            response = client.get(url)
+            if response.status_code != 200:
+                result['outcome'] = f'ERROR http_{response.status_code}'
+
+    cache.clear()
+    cold.elapsed = run_concurrently(doctors, workers, lambda d, s: work(d, s, cold))
+    tasks = [random.choice(doctors) for _ in range(requests)]
+    warm.elapsed = run_concurrently(tasks, workers, lambda d, s: work(d, s, warm))
+    return [cold, warm]
+
+
+BOOKING_ERROR_PREFIX = 'Error booking appointment: '
+
+
+def booking_outcome(response):
+    """``'booked'``, ``'rejected'`` (slot taken, patient already booked) or an error.
+
+    Read from the message the view left, since every outcome redirects.
+    Unexpected exceptions (e.g. "database is locked") become
+    ``'ERROR <message>'`` so they are not mistaken for a lost race.
+    """
+    if response.status_code != 302:
+        return f'ERROR http_{response.status_code}'
+    for message in messages.get_messages(response.wsgi_request):
+        if message.level == messages.SUCCESS:
+            return 'booked'
+        if message.message.startswith(BOOKING_ERROR_PREFIX):
+            return f'ERROR {message.message[len(BOOKING_ERROR_PREFIX):]}'
+    return 'rejected'
+
+
+def check_bookings(samples, attempts):
+    """Compare ``'booked'`` outcomes with the bookings actually created."""
+    created = sum(
+        Booking.objects.filter(patient=patient, slot=slot).exists()
+        for patient, slot in attempts
+    )
+    if created != samples.outcomes.get('booked', 0):
+        samples.outcomes['MISMATCH_db_bookings'] = created
+
+
+def booking(patients, slots, workers, name):
+    """Each patient tries to book one of ``slots`` at random."""
+    samples = Samples(name)
+    attempts = [(patient, random.choice(slots)) for patient in patients]
+
+    def work(attempt, state):
+        patient, slot = attempt
+        client = logged_in_client(state, patient)
+        with samples.measure() as result:
+            response = client.post(reverse('book_appointment', args=[slot.id]))
+            result['outcome'] = booking_outcome(response)
+
+    samples.elapsed = run_concurrently(attempts, workers, work)
+    check_bookings(samples, attempts)
+    return [samples]
+
+
+def booking_contention(patients, hot_slots, workers):
+    """Many patients racing for a handful of hot slots."""
+    return booking(patients, hot_slots, workers, f'book ({len(hot_slots)} hot slots)')
+
+
+def booking_spread(patients, workers):
+    """Patients booking distinct free slots (no contention)."""
+    free = list(AvailabilitySlot.objects.filter(is_booked=False).order_by('?')[:len(patients)])
+    samples = Samples('book (spread)')
+
+    def work(attempt, state):
+        patient, slot = attempt
+        client = logged_in_client(state, patient)
+        with samples.measure() as result:
+            response = client.post(reverse('book_appointment', args=[slot.id]))
+            result['outcome'] = booking_outcome(response)
+
+    attempts = list(zip(patients, free))
+    samples.elapsed = run_concurrently(attempts, workers, work)
+    check_bookings(samples, attempts)
+    if len(free) < len(patients):
+        samples.outcomes['ERROR no free slot left'] = len(patients) - len(free)
+    # Nobody competes for these slots, so every attempt must succeed.
+    if samples.outcomes.get('rejected'):
+        samples.outcomes['ERROR rejected without contention'] = samples.outcomes['rejected']
+    return [samples]
+
+
+def outbox_drain(email_stub, batch_size=100):
+    """Deliver everything queued by the booking scenarios."""
+    samples = Samples('outbox drain (per batch)')
+    email_requests = email_stub.requests
+    calendar_calls = len(fake_calendar.calls)
+
+    started = time.perf_counter()
+    while True:
+        with samples.measure():
+            sent, failed = process_batch(batch_size=batch_size)
+        if not sent and not failed:
+            break
+    samples.elapsed = time.perf_counter() - started
+    samples.outcomes = {
+        'email_http_requests': email_stub.requests - email_requests,
+        'calendar_calls': len(fake_calendar.calls) - calendar_calls,
+    }
+    return [samples]
+
+
+def reminders(email_stub):
+    """One run of the send_appointment_reminders job."""
+    samples = Samples('reminder job (24h)')
+    messages = email_stub.messages
+    with samples.measure():
+        call_command('send_appointment_reminders', type='24h', stdout=StringIO())
+    samples.outcomes = {'emails': email_stub.messages - messages}
+    return [samples]
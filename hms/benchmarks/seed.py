@@ -0,0 +1,70 @@
+"""Bulk seeding of doctors, slots, patients and bookings."""
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from bookings.models import Booking
+from doctors.models import AvailabilitySlot
+
+SLOT_MINUTES = 30
+DAY_START = time(8, 0)
+SLOTS_PER_DAY = 20
+
+
+def make_users(role, count, prefix):
+    users = [
+        CustomUser(
+            username=f'{prefix}{i}',
+            email=f'{prefix}{i}@bench.local',
+            first_name=prefix.title(),
+            last_name=str(i),
+            role=role,
+            password='!',  # unusable; benchmark clients use force_login
+        )
+        for i in range(count)
+    ]
+    CustomUser.objects.bulk_create(users, batch_size=1000)
+    return list(CustomUser.objects.filter(role=role, username__startswith=prefix).order_by('id'))
+
+
+def make_slots(doctors, slots_per_doctor, first_day):
+    """``slots_per_doctor`` half-hour slots per doctor, filling days from ``first_day``."""
+    slots = []
+    for doctor in doctors:
+        for i in range(slots_per_doctor):
+            day = first_day + timedelta(days=i // SLOTS_PER_DAY)
+            start = datetime.combine(day, DAY_START) + timedelta(minutes=SLOT_MINUTES * (i % SLOTS_PER_DAY))
+            slot = AvailabilitySlot(
+                doctor=doctor,
+                date=day,
+                start_time=start.time(),
+                end_time=(start + timedelta(minutes=SLOT_MINUTES)).time(),
+            )
+            slot.sync_datetimes()
+            slots.append(slot)
+    AvailabilitySlot.objects.bulk_create(slots, batch_size=1000)
+    return slots
+
+
+def book_directly(patients, slots):
+    """Create bookings without going through the views (for reminder runs)."""
+    bookings = [
+        Booking(patient=patient, doctor_id=slot.doctor_id, slot=slot)
+        for patient, slot in zip(patients, slots)
+    ]
+    Booking.objects.bulk_create(bookings, batch_size=1000)
+    AvailabilitySlot.objects.filter(id__in=[booking.slot_id for booking in bookings]).update(is_booked=True)
+    return len(bookings)
+
+
+def seed(doctors, slots_per_doctor, patients):
+    """Seed the database; returns ``(doctors, patients)``.
+
+    Slots start tomorrow so that booked ones are due a 24h reminder.
+    """
+    first_day = timezone.localdate() + timedelta(days=1)
+    doctor_users = make_users('DOCTOR', doctors, 'doctor')
+    patient_users = make_users('PATIENT', patients, 'patient')
+    make_slots(doctor_users, slots_per_doctor, first_day)
+    return doctor_users, patient_users
@@ -0,0 +1,86 @@
+"""Latency sample collection and percentile reporting."""
+import threading
+import time
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+class Samples:
+    """Thread-safe collector of per-request latency and query counts."""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.queries = []
+        self.outcomes = {}
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, queries, outcome='ok'):
+        with self._lock:
+            self.latencies.append(seconds * 1000)
+            self.queries.append(queries)
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    @contextmanager
+    def measure(self):
+        """Time the block and count the queries it runs on this thread.
+
+        The block may set ``result['outcome']`` on the yielded dict.
+        """
+        result = {'outcome': 'ok'}
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            yield result
+            seconds = time.perf_counter() - started
+        self.add(seconds, len(captured), result['outcome'])
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        count = len(latencies)
+        return {
+            'name': self.name,
+            'requests': count,
+            'throughput': count / self.elapsed if self.elapsed else None,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1] if latencies else 0.0,
+            'queries_mean': sum(self.queries) / count if count else 0.0,
+            'queries_max': max(self.queries, default=0),
+            'outcomes': dict(sorted(self.outcomes.items())),
+        }
+
+
+def failures(summary):
+    """Outcomes that mean a request went wrong, as ``{outcome: count}``."""
+    return {
+        key: value for key, value in summary['outcomes'].items()
+        if key.startswith(('ERROR', 'MISMATCH'))
+    }
+
+
+def format_summary(summary):
+    """One report line for ``Samples.summary()``."""
+    throughput = summary['throughput']
+    line = (
+        f"{summary['name']:<28} n={summary['requests']:<6} "
+        f"p50={summary['p50_ms']:7.1f}ms p95={summary['p95_ms']:7.1f}ms "
+        f"p99={summary['p99_ms']:7.1f}ms max={summary['max_ms']:7.1f}ms "
+        f"queries={summary['queries_mean']:.1f} (max {summary['queries_max']})"
+    )
+    if throughput is not None:
+        line += f" {throughput:.0f} req/s"
+    if list(summary['outcomes']) != ['ok']:
+        line += ' ' + ', '.join(f'{key}={value}' for key, value in summary['outcomes'].items())
+    return line
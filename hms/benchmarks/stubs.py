@@ -0,0 +1,77 @@
+"""Local stand-ins for the email service and Google Calendar.
+
+The email stub is a real HTTP server on localhost implementing the
+``/send-email`` and ``/send-emails`` endpoints of ``email-service``, so the
+pooled ``requests`` session is exercised as in production. Calendar calls
+go to ``services.fake_calendar`` through ``GOOGLE_CALENDAR_HTTP_FACTORY``.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class EmailStubServer(ThreadingHTTPServer):
+    """Accepts every email after an optional artificial delay."""
+
+    daemon_threads = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(('127.0.0.1', 0), EmailStubHandler)
+        self.latency = latency
+        self.requests = 0
+        self.messages = 0
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def record(self, messages):
+        with self.lock:
+            self.requests += 1
+            self.messages += messages
+
+
+class EmailStubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'{}')
+
+        if self.path.endswith('/send-emails'):
+            messages = body.get('messages', [])
+            response = {
+                'results': [{'index': i, 'status': 200} for i in range(len(messages))],
+                'sent': len(messages),
+                'failed': 0,
+            }
+        else:
+            messages = [body]
+            response = {'message': 'Email sent successfully'}
+
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.server.record(len(messages))
+
+        content = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
@@ -0,0 +1,47 @@
+"""Query budgets (benchmarks/query_budgets.py) as part of the test suite."""
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from . import query_budgets
+from .stubs import EmailStubServer
+
+SIZES = (10, 100)
+
+
+class QueryBudgetTests(TestCase):
+    """Every checked view, admin changelist and batch job stays within budget."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.email_stub = EmailStubServer().start()
+        cls.addClassCleanup(cls.email_stub.stop)
+
+    def measure_all(self, case_list, size):
+        """Seed ``size`` rows, count every case, then roll the seed back."""
+        counts = {}
+        try:
+            with transaction.atomic():
+                fixtures = query_budgets.seed(size)
+                for case in case_list:
+                    counts[case.name] = len(query_budgets.measure(case, fixtures))
+                raise query_budgets.Rollback
+        except query_budgets.Rollback:
+            pass
+        return counts
+
+    def test_budgets(self):
+        case_list = query_budgets.cases()
+        with override_settings(
+            EMAIL_SERVICE_URL=self.email_stub.url,
+            GOOGLE_CALENDAR_HTTP_FACTORY='services.fake_calendar.FakeCalendarHttp',
+        ):
+            by_size = {size: self.measure_all(case_list, size) for size in SIZES}
+
+        for case in case_list:
+            counts = {size: by_size[size][case.name] for size in SIZES}
+            with self.subTest(case.name, counts=counts, budget=case.budget):
+                self.assertEqual(query_budgets.problems(case, counts), [])
+
+    def test_every_url_has_a_case(self):
+        self.assertEqual(query_budgets.uncovered(query_budgets.cases()), [])
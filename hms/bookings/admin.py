@@ -1,6 +1,7 @@
 """Admin configuration for bookings app."""
 from django.contrib import admin
-from .models import Booking
+from accounts.paginators import EstimatedCountPaginator
+from .models import Booking, CalendarEvent, OutboxMessage, WaitlistEntry
 
 
 @admin.register(Booking)
@@ -8,7 +9,48 @@ class BookingAdmin(admin.ModelAdmin):
     """Admin for Booking model."""
     
     list_display = ('patient', 'doctor', 'slot', 'created_at')
-    list_filter = ('created_at', 'doctor')
+    list_select_related = ('patient', 'doctor', 'slot__doctor')
+    list_filter = ('reminder_sent_24h', 'reminder_sent_1h')
     search_fields = ('patient__email', 'doctor__email')
     date_hierarchy = 'created_at'
+    autocomplete_fields = ('patient', 'doctor')
+    raw_id_fields = ('slot',)
+    readonly_fields = ('created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """Admin for OutboxMessage model."""
+    
+    list_display = ('id', 'kind', 'status', 'attempts', 'available_at', 'processed_at')
+    list_filter = ('status', 'kind')
+    readonly_fields = ('created_at', 'processed_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(CalendarEvent)
+class CalendarEventAdmin(admin.ModelAdmin):
+    """Admin for CalendarEvent model."""
+    
+    list_display = ('event_id', 'user', 'booking_id', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('user__email', 'event_id')
+    raw_id_fields = ('user',)
+    readonly_fields = ('created_at',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    """Admin for WaitlistEntry model."""
+    
+    list_display = ('patient', 'doctor', 'date', 'created_at')
+    list_select_related = ('patient', 'doctor')
+    search_fields = ('patient__email', 'doctor__email')
+    date_hierarchy = 'date'
+    autocomplete_fields = ('patient', 'doctor')
     readonly_fields = ('created_at',)
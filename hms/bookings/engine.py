@@ -0,0 +1,166 @@
+"""Booking and cancellation as single transactions.
+
+Shared by the booking views. The functions are synchronous because Django
+4.2 transactions are; async views call them through ``sync_to_async``.
+
+Two booking strategies are available, chosen with ``BOOKING_ENGINE``:
+
+``locking``
+    Locks the slot row with ``SELECT ... FOR UPDATE`` and checks it. On
+    SQLite this takes the database-wide write lock for the whole
+    transaction, and on Postgres contenders for a hot slot queue up.
+``optimistic``
+    Claims the slot with one conditional ``UPDATE ... WHERE is_booked =
+    false`` and checks the row count; the loser of a race sees 0 rows and
+    gives up at once. The Booking OneToOne constraints catch a patient
+    booking twice. Lock timeouts are retried a few times with backoff.
+
+Cancelling hands the slot to the next waitlisted patient, if any, in the
+same transaction (see ``bookings.waitlist``).
+"""
+import random
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, OperationalError, transaction
+from django.utils import timezone
+
+from doctors.models import AvailabilitySlot
+from doctors.summary import invalidate_doctor_summary
+from services.slot_events import publish_slot_event
+from .models import Booking
+from .outbox import enqueue_booking_confirmation, enqueue_booking_cancelled
+from .waitlist import assign_from_waitlist
+
+
+class SlotUnavailable(Exception):
+    """Raised when the slot was booked or became unbookable."""
+
+
+class PatientAlreadyBooked(Exception):
+    """Raised when the patient already holds a booking."""
+
+
+def book_slot(patient, slot_id):
+    """Book ``slot_id`` for ``patient`` with the configured engine.
+
+    Raises ``AvailabilitySlot.DoesNotExist``, ``SlotUnavailable`` or
+    ``PatientAlreadyBooked``.
+    """
+    try:
+        engine = ENGINES[settings.BOOKING_ENGINE]
+    except KeyError:
+        raise ImproperlyConfigured(
+            f"BOOKING_ENGINE must be one of {sorted(ENGINES)}, not {settings.BOOKING_ENGINE!r}"
+        )
+    return engine(patient, slot_id)
+
+
+def book_slot_locking(patient, slot_id):
+    """Book ``slot_id`` holding a row lock on the slot."""
+    with transaction.atomic():
+        # Use select_for_update() to lock the slot
+        slot = AvailabilitySlot.objects.select_for_update().get(id=slot_id)
+
+        # Double-check if slot is available
+        if slot.is_booked or not slot.can_be_booked():
+            raise SlotUnavailable("This slot is no longer available.")
+
+        # Create booking
+        booking = Booking.objects.create(
+            patient=patient,
+            doctor=slot.doctor,
+            slot=slot
+        )
+
+        # Mark slot as booked
+        slot.is_booked = True
+        slot.save()
+
+        # Queue confirmation emails and calendar events for both
+        # doctor and patient; process_outbox delivers them after commit
+        enqueue_booking_confirmation(booking)
+        invalidate_doctor_summary(slot.doctor_id)
+        publish_slot_event('booked', slot)
+
+    return booking
+
+
+def book_slot_optimistic(patient, slot_id, retries=None):
+    """Book ``slot_id`` by claiming it with a conditional UPDATE."""
+    retries = settings.BOOKING_MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        try:
+            return _claim_and_book(patient, slot_id)
+        except OperationalError:
+            # SQLite reports a busy write lock as "database is locked".
+            attempt += 1
+            if attempt > retries:
+                raise
+            time.sleep(random.uniform(0, 0.01 * 2 ** attempt))
+
+
+def _claim_and_book(patient, slot_id):
+    with transaction.atomic():
+        claimed = AvailabilitySlot.objects.filter(
+            id=slot_id, is_booked=False, starts_at__gt=timezone.now()
+        ).update(is_booked=True, updated_at=timezone.now())
+
+        if not claimed:
+            if not AvailabilitySlot.objects.filter(id=slot_id).exists():
+                raise AvailabilitySlot.DoesNotExist("Slot not found.")
+            raise SlotUnavailable("This slot is no longer available.")
+
+        slot = AvailabilitySlot.objects.select_related('doctor').get(id=slot_id)
+        try:
+            # Savepoint, so the error can be translated; raising it rolls
+            # back the claim with the outer transaction.
+            with transaction.atomic():
+                booking = Booking.objects.create(
+                    patient=patient,
+                    doctor=slot.doctor,
+                    slot=slot
+                )
+        except IntegrityError:
+            raise PatientAlreadyBooked("You already have a booking. Cancel it first to book another.")
+
+        enqueue_booking_confirmation(booking)
+        invalidate_doctor_summary(slot.doctor_id)
+        publish_slot_event('booked', slot)
+
+    return booking
+
+
+ENGINES = {
+    'locking': book_slot_locking,
+    'optimistic': book_slot_optimistic,
+}
+
+
+def cancel_patient_booking(patient):
+    """Cancel ``patient``'s booking. Raises ``Booking.DoesNotExist``.
+
+    Returns the booking that took over the slot from the waitlist, or None
+    if the slot was released.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_related('patient', 'doctor', 'slot').get(patient=patient)
+
+        # Queue cancellation email before deleting
+        enqueue_booking_cancelled(booking)
+
+        # Delete booking
+        slot = booking.slot
+        booking.delete()
+        invalidate_doctor_summary(booking.doctor_id)
+
+        # The slot stays booked if someone was waiting for it
+        successor = assign_from_waitlist(slot, booking.doctor)
+        if successor is None:
+            slot.is_booked = False
+            slot.save()
+            publish_slot_event('freed', slot)
+
+    return successor
@@ -0,0 +1,22 @@
+"""Forms for bookings app."""
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from accounts.models import CustomUser
+
+
+class WaitlistForm(forms.Form):
+    """Join a doctor's waitlist for one date."""
+    
+    doctor = forms.ModelChoiceField(
+        queryset=CustomUser.objects.filter(role='DOCTOR'),
+        widget=forms.HiddenInput
+    )
+    date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    
+    def clean_date(self):
+        """Reject past dates."""
+        date = self.cleaned_data['date']
+        if date < timezone.localdate():
+            raise ValidationError("Waitlist date must not be in the past.")
+        return date
@@ -0,0 +1,71 @@
+"""Management command to deliver queued booking side effects."""
+from django.core.management.base import BaseCommand
+from bookings.outbox import process_batch, MAX_ATTEMPTS
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Command to drain the booking outbox."""
+    
+    help = 'Deliver pending outbox messages (emails and calendar events)'
+    
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Number of messages to claim per batch',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=MAX_ATTEMPTS,
+            help='Attempts before a message is marked as failed',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and poll for new messages',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=2.0,
+            help='Seconds to sleep between polls when the outbox is empty (with --loop)',
+        )
+    
+    def handle(self, *args, **options):
+        """Handle command execution."""
+        batch_size = options['batch_size']
+        max_attempts = options['max_attempts']
+        
+        while True:
+            sent, failed = self.drain(batch_size, max_attempts)
+            if sent or failed:
+                self.stdout.write(
+                    self.style.SUCCESS(f'  Delivered {sent} outbox messages ({failed} failed)')
+                )
+            
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+    
+    def drain(self, batch_size, max_attempts):
+        """Process batches until nothing is due."""
+        total_sent = total_failed = 0
+        while True:
+            try:
+                sent, failed = process_batch(batch_size, max_attempts)
+            except Exception as e:
+                logger.error(f"Error processing outbox: {str(e)}")
+                self.stdout.write(self.style.ERROR(f'✗ Error processing outbox: {str(e)}'))
+                break
+            total_sent += sent
+            total_failed += failed
+            if sent + failed < batch_size:
+                break
+        return total_sent, total_failed
@@ -0,0 +1,96 @@
+"""Management command that keeps running and sends reminders when they are due."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+from bookings.reminders import ReminderScheduler
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# First wait after an error; doubles on each consecutive error up to the
+# poll interval.
+ERROR_BACKOFF = timedelta(seconds=1)
+
+
+class Command(BaseCommand):
+    """Resident replacement for cron-invoked send_appointment_reminders."""
+    
+    help = 'Run the appointment reminder scheduler (24h and 1h reminders) until stopped'
+    
+    def add_arguments(self, parser):
+        """Add command arguments."""
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=30.0,
+            help='Seconds between checks for new bookings',
+        )
+        parser.add_argument(
+            '--horizon-hours',
+            type=float,
+            default=25.0,
+            help='How far ahead bookings are loaded into memory',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of due bookings loaded and flagged per chunk',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of batch requests sent to the email service in parallel',
+        )
+    
+    def handle(self, *args, **options):
+        """Handle command execution."""
+        poll_interval = timedelta(seconds=options['poll_interval'])
+        batch_size = max(1, options['batch_size'])
+        scheduler = ReminderScheduler(horizon=timedelta(hours=options['horizon_hours']))
+        next_poll = timezone.now()
+        failures = 0
+        
+        self.stdout.write(self.style.SUCCESS('✓ Reminder scheduler started'))
+        
+        with ThreadPoolExecutor(max_workers=max(1, options['concurrency'])) as executor:
+            try:
+                while True:
+                    close_old_connections()
+                    now = timezone.now()
+                    resume_at = now
+                    
+                    try:
+                        if now >= next_poll:
+                            added = scheduler.load(now)
+                            next_poll = now + poll_interval
+                            failures = 0
+                            if added:
+                                self.stdout.write(f'  Scheduled {added} reminders ({len(scheduler)} pending)')
+                        
+                        sent = scheduler.run_due(now, executor, batch_size)
+                        if sent:
+                            self.stdout.write(self.style.SUCCESS(f'  Sent {sent} reminders'))
+                    except Exception as e:
+                        logger.error(f"Error in reminder scheduler: {str(e)}")
+                        self.stdout.write(self.style.ERROR(f'✗ Error in reminder scheduler: {str(e)}'))
+                        # Back off instead of retrying at once: the failed
+                        # poll and the pushed-back reminders are both due now.
+                        resume_at = now + min(poll_interval, ERROR_BACKOFF * 2 ** failures)
+                        next_poll = max(next_poll, resume_at)
+                        failures += 1
+                    
+                    # Sleep until the next reminder is due or the next poll,
+                    # whichever comes first, but not before ``resume_at``.
+                    wake_at = next_poll
+                    next_due = scheduler.next_due()
+                    if next_due is not None and next_due < wake_at:
+                        wake_at = max(next_due, resume_at)
+                    time.sleep(max(0.0, (wake_at - timezone.now()).total_seconds()))
+            
+            except KeyboardInterrupt:
+                self.stdout.write('Reminder scheduler stopped')
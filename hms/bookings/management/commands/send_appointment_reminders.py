@@ -1,9 +1,10 @@
 """Management command to send appointment reminders."""
+from concurrent.futures import ThreadPoolExecutor
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
 from bookings.models import Booking
-from services.email_client import send_appointment_reminder
+from bookings.reminders import send_reminder_chunk, starts_between
 import logging
 
 logger = logging.getLogger(__name__)
@@ -23,10 +24,25 @@ class Command(BaseCommand):
             choices=['24h', '1h', 'all'],
             help='Type of reminder to send: 24h, 1h, or all',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of bookings loaded and flagged per chunk',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of batch requests sent to the email service in parallel',
+        )
     
     def handle(self, *args, **options):
         """Handle command execution."""
         reminder_type = options['type']
+        self.batch_size = max(1, options['batch_size'])
+        self.concurrency = max(1, options['concurrency'])
+        self.verbosity = options['verbosity']
         now = timezone.now()
         
         try:
@@ -58,20 +74,13 @@ class Command(BaseCommand):
         
         # Find bookings for tomorrow that haven't been reminded
         tomorrow_bookings = Booking.objects.filter(
-            slot__date__gte=tomorrow_start.date(),
-            slot__date__lt=tomorrow_end.date(),
+            slot__starts_at__gte=tomorrow_start,
+            slot__starts_at__lt=tomorrow_end,
+            slot__is_booked=True,
             reminder_sent_24h=False
         )
         
-        sent_count = 0
-        for booking in tomorrow_bookings:
-            if send_appointment_reminder(booking, hours_before=24):
-                booking.reminder_sent_24h = True
-                booking.save()
-                sent_count += 1
-                self.stdout.write(
-                    f'  ✓ 24h reminder sent for booking {booking.id}'
-                )
+        sent_count = self.send_reminders(tomorrow_bookings, 24)
         
         self.stdout.write(
             self.style.SUCCESS(f'  Sent {sent_count} 24-hour reminders')
@@ -84,22 +93,46 @@ class Command(BaseCommand):
         
         # Find bookings within next hour that haven't been reminded
         upcoming_bookings = Booking.objects.filter(
-            slot__date=now.date(),
-            slot__start_time__lte=one_hour_later.time(),
-            slot__start_time__gt=now.time(),
+            starts_between(now, one_hour_later),
+            slot__is_booked=True,
             reminder_sent_1h=False
         )
         
-        sent_count = 0
-        for booking in upcoming_bookings:
-            if send_appointment_reminder(booking, hours_before=1):
-                booking.reminder_sent_1h = True
-                booking.save()
-                sent_count += 1
-                self.stdout.write(
-                    f'  ✓ 1h reminder sent for booking {booking.id}'
-                )
+        sent_count = self.send_reminders(upcoming_bookings, 1)
         
         self.stdout.write(
             self.style.SUCCESS(f'  Sent {sent_count} 1-hour reminders')
         )
+    
+    def send_reminders(self, bookings, hours_before):
+        """Send reminders for ``bookings`` chunk by chunk.
+        
+        Each chunk is one joined query, its emails go out as parallel batch
+        requests, and the sent bookings are flagged with a single UPDATE.
+        Chunks are walked by primary key so flagged rows never shift the
+        window of the next chunk.
+        """
+        bookings = bookings.select_related('patient', 'doctor', 'slot').order_by('id')
+        sent_count = 0
+        last_id = 0
+        
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while True:
+                chunk = list(bookings.filter(id__gt=last_id)[:self.batch_size])
+                if not chunk:
+                    break
+                last_id = chunk[-1].id
+                
+                sent_ids = send_reminder_chunk(chunk, hours_before, executor)
+                sent_count += len(sent_ids)
+                
+                if self.verbosity >= 2:
+                    for booking_id in sent_ids:
+                        self.stdout.write(
+                            f'  ✓ {hours_before}h reminder sent for booking {booking_id}'
+                        )
+                
+                if len(chunk) < self.batch_size:
+                    break
+        
+        return sent_count
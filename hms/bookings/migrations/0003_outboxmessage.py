@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_booking_reminder_sent_1h_booking_reminder_sent_24h'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('EMAIL', 'Email'), ('CALENDAR_EVENT', 'Calendar Event')], max_length=20)),
+                ('payload', models.JSONField(help_text='Data needed to perform the side effect')),
+                ('status', models.CharField(choices=[('PENDING', 'Pending'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='PENDING', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time the next attempt may run')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Outbox Message',
+                'verbose_name_plural': 'Outbox Messages',
+                'db_table': 'bookings_outboxmessage',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='bookings_ou_status_e8a548_idx')],
+            },
+        ),
+    ]
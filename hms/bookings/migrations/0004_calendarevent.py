@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:11
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0003_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='outboxmessage',
+            name='kind',
+            field=models.CharField(choices=[('EMAIL', 'Email'), ('CALENDAR_EVENT', 'Calendar Event'), ('CALENDAR_DELETE', 'Calendar Event Removal')], max_length=20),
+        ),
+        migrations.CreateModel(
+            name='CalendarEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('booking_id', models.PositiveBigIntegerField()),
+                ('event_id', models.CharField(help_text='Google Calendar event id', max_length=1024)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Calendar Event',
+                'verbose_name_plural': 'Calendar Events',
+                'db_table': 'bookings_calendarevent',
+                'indexes': [models.Index(fields=['booking_id', 'user'], name='bookings_ca_booking_4a2508_idx')],
+            },
+        ),
+    ]
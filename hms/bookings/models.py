@@ -1,6 +1,7 @@
 """Models for bookings app."""
 from django.db import models
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 from accounts.models import CustomUser
 from doctors.models import AvailabilitySlot
 
@@ -38,6 +39,9 @@ class Booking(models.Model):
         verbose_name = 'Booking'
         verbose_name_plural = 'Bookings'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='booking_created_idx'),
+        ]
     
     def __str__(self):
         """String representation."""
@@ -50,3 +54,114 @@ class Booking(models.Model):
         
         if Booking.objects.filter(patient=self.patient).exists():
             raise ValidationError("Patient can only have one booking.")
+
+
+class OutboxMessage(models.Model):
+    """Side effect recorded in the booking transaction and delivered later."""
+    
+    KIND_CHOICES = (
+        ('EMAIL', 'Email'),
+        ('CALENDAR_EVENT', 'Calendar Event'),
+        ('CALENDAR_DELETE', 'Calendar Event Removal'),
+    )
+    
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+    
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(help_text="Data needed to perform the side effect")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now, help_text="Earliest time the next attempt may run")
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        """Meta options for OutboxMessage."""
+        db_table = 'bookings_outboxmessage'
+        verbose_name = 'Outbox Message'
+        verbose_name_plural = 'Outbox Messages'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+    
+    def __str__(self):
+        """String representation."""
+        return f"{self.get_kind_display()} #{self.id} ({self.get_status_display()})"
+
+
+class CalendarEvent(models.Model):
+    """Google Calendar event created for a booking.
+    
+    Kept so the event can be removed when the booking is cancelled. The
+    booking is referenced by id only because the event outlives the row.
+    """
+    
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='calendar_events'
+    )
+    booking_id = models.PositiveBigIntegerField()
+    event_id = models.CharField(max_length=1024, help_text="Google Calendar event id")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        """Meta options for CalendarEvent."""
+        db_table = 'bookings_calendarevent'
+        verbose_name = 'Calendar Event'
+        verbose_name_plural = 'Calendar Events'
+        indexes = [
+            models.Index(fields=['booking_id', 'user']),
+        ]
+    
+    def __str__(self):
+        """String representation."""
+        return f"Event {self.event_id} for booking #{self.booking_id}"
+
+
+class WaitlistEntry(models.Model):
+    """Patient waiting for a cancellation with a doctor on a given date.
+    
+    When a booking is cancelled, the freed slot goes straight to the
+    earliest entry for that doctor and date (see ``bookings.waitlist``)
+    instead of being released to everyone browsing slots.
+    """
+    
+    patient = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        limit_choices_to={'role': 'PATIENT'}
+    )
+    
+    doctor = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='waitlisted_patients',
+        limit_choices_to={'role': 'DOCTOR'}
+    )
+    
+    date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        """Meta options for WaitlistEntry."""
+        db_table = 'bookings_waitlistentry'
+        verbose_name = 'Waitlist Entry'
+        verbose_name_plural = 'Waitlist Entries'
+        ordering = ['created_at', 'id']
+        unique_together = ('patient', 'doctor', 'date')
+        indexes = [
+            # The allocator reads the head of one doctor/date queue.
+            models.Index(fields=['doctor', 'date', 'created_at'], name='waitlist_queue_idx'),
+        ]
+    
+    def __str__(self):
+        """String representation."""
+        return f"{self.patient.email} waiting for {self.doctor.email} on {self.date}"
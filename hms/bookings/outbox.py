@@ -0,0 +1,290 @@
+"""Transactional outbox for booking and signup side effects.
+
+Views record emails and calendar events as ``OutboxMessage`` rows inside the
+same transaction as the booking change or new account. The ``process_outbox`` management
+command delivers them afterwards, so no network call happens while slot rows
+are locked.
+
+A batch is handled in three steps: a short transaction leases the due rows
+to this worker, delivery runs outside any transaction, and a second short
+transaction records the results. Delivery is grouped by kind: emails go out
+through the email service's batch endpoint, and calendar inserts and
+removals are grouped per user into Google batch requests.
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from services.email_client import (
+    send_payloads,
+    booking_confirmation_payloads,
+    booking_cancelled_payload,
+    signup_welcome_payload,
+)
+from services.google_calendar import event_body, sync_calendar_events
+from .models import Booking, CalendarEvent, OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 30
+# How long a claimed message stays hidden from other workers. A worker that
+# dies mid-batch leaves its messages to be retried once the lease runs out.
+LEASE_SECONDS = 300
+
+
+def enqueue_booking_confirmation(booking):
+    """Record confirmation emails and calendar events for a new booking."""
+    messages = [
+        OutboxMessage(kind='EMAIL', payload=payload)
+        for payload in booking_confirmation_payloads(booking)
+    ]
+    messages += [
+        OutboxMessage(
+            kind='CALENDAR_EVENT',
+            payload={'user_id': user_id, 'booking_id': booking.id},
+        )
+        for user_id in (booking.doctor_id, booking.patient_id)
+    ]
+    OutboxMessage.objects.bulk_create(messages)
+
+
+def enqueue_booking_cancelled(booking):
+    """Record the cancellation email and calendar event removals.
+
+    Must run before the booking is deleted.
+    """
+    messages = [
+        OutboxMessage(kind='EMAIL', payload=booking_cancelled_payload(booking)),
+    ]
+    messages += [
+        OutboxMessage(
+            kind='CALENDAR_DELETE',
+            payload={'user_id': user_id, 'booking_id': booking.id},
+        )
+        for user_id in (booking.doctor_id, booking.patient_id)
+    ]
+    OutboxMessage.objects.bulk_create(messages)
+
+
+def enqueue_signup_welcome(user):
+    """Record the welcome email for a new account."""
+    OutboxMessage.objects.create(kind='EMAIL', payload=signup_welcome_payload(user))
+
+
+def retry_delay(attempts):
+    """Exponential backoff between delivery attempts."""
+    return timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+RESULT_FIELDS = ['status', 'attempts', 'last_error', 'available_at', 'processed_at']
+
+
+def record_result(message, ok, error='', max_attempts=MAX_ATTEMPTS):
+    """Set the outcome of one delivery attempt on the message.
+
+    The attempt was already counted when the message was claimed. Not saved
+    here; ``process_batch`` writes the whole batch at once.
+    """
+    now = timezone.now()
+
+    if ok:
+        message.status = 'SENT'
+        message.processed_at = now
+        message.last_error = ''
+    else:
+        logger.warning(f"Outbox message {message.id} failed: {error}")
+        message.last_error = error
+        if message.attempts >= max_attempts:
+            message.status = 'FAILED'
+            message.processed_at = now
+        else:
+            message.available_at = now + retry_delay(message.attempts)
+
+
+def deliver_emails(messages, max_attempts=MAX_ATTEMPTS):
+    """Send all email messages of a batch in one batch request.
+
+    Returns ``(outcomes, save)`` like every batch handler; emails have
+    nothing to save besides the messages themselves.
+    """
+    results = send_payloads([message.payload for message in messages])
+    for message, ok in zip(messages, results):
+        record_result(message, ok, '' if ok else 'Email service did not accept message', max_attempts)
+    return results, None
+
+
+def deliver_calendar(messages, max_attempts=MAX_ATTEMPTS):
+    """Apply calendar inserts and removals, one Google batch per user.
+
+    Messages whose booking was cancelled before its event was created, whose
+    user disconnected Google, or that have nothing left to remove succeed
+    without a call. Returns ``(outcomes, save)``, where ``save`` stores the
+    created and removed ``CalendarEvent`` rows.
+    """
+    booking_ids = {message.payload['booking_id'] for message in messages}
+    users = CustomUser.objects.in_bulk({message.payload['user_id'] for message in messages})
+    bookings = Booking.objects.select_related('patient', 'doctor', 'slot').in_bulk(booking_ids)
+
+    created = defaultdict(list)
+    for event in CalendarEvent.objects.filter(booking_id__in=booking_ids):
+        created[(event.user_id, event.booking_id)].append(event)
+
+    by_user = defaultdict(list)
+    for message in messages:
+        by_user[message.payload['user_id']].append(message)
+
+    results = {}
+    removed_ids = []
+    for user_id, user_messages in by_user.items():
+        user = users.get(user_id)
+        if user is None or not user.google_calendar_token:
+            results.update((message.id, (True, '')) for message in user_messages)
+            continue
+        user_results, user_removed = _sync_user(user, user_messages, bookings, created)
+        results.update(user_results)
+        removed_ids += user_removed
+
+    new_events = []
+    outcomes = []
+    for message in messages:
+        ok, detail = results[message.id]
+        if ok and message.kind == 'CALENDAR_EVENT' and detail:
+            new_events.append(CalendarEvent(
+                user_id=message.payload['user_id'],
+                booking_id=message.payload['booking_id'],
+                event_id=detail,
+            ))
+        record_result(message, ok, '' if ok else detail, max_attempts)
+        outcomes.append(ok)
+
+    def save():
+        CalendarEvent.objects.bulk_create(new_events)
+        if removed_ids:
+            CalendarEvent.objects.filter(id__in=removed_ids).delete()
+    return outcomes, save
+
+
+def _sync_user(user, messages, bookings, created):
+    """Send one user's calendar messages as a batch.
+
+    Returns ``({message id: (ok, detail)}, removed)`` where ``detail`` is the
+    new event id for inserts or the error text for failures, and ``removed``
+    lists the ``CalendarEvent`` ids whose events are gone. Removed events
+    are dropped even when a sibling call failed, so a retry only repeats
+    what did not go through.
+    """
+    results = {}
+    inserts = []
+    deletes = []
+    for message in messages:
+        booking_id = message.payload['booking_id']
+        if message.kind == 'CALENDAR_EVENT':
+            booking = bookings.get(booking_id)
+            if booking is None:
+                # Booking was cancelled before its event was created.
+                results[message.id] = (True, '')
+            else:
+                inserts.append((str(message.id), event_body(user, booking)))
+        else:
+            results[message.id] = (True, '')
+            deletes += [
+                (f"{message.id}-{event.id}", event.event_id)
+                for event in created.get((user.id, booking_id), [])
+            ]
+
+    if not inserts and not deletes:
+        return results, []
+
+    try:
+        synced = sync_calendar_events(user, inserts, deletes)
+        error = 'Calendar call failed'
+    except Exception as e:
+        logger.exception(f"Calendar batch for {user.email} failed")
+        synced = {}
+        error = str(e)
+
+    for key, _ in inserts:
+        event_id = synced.get(key)
+        results[int(key)] = (True, event_id) if event_id else (False, error)
+
+    removed = []
+    for key, _ in deletes:
+        message_id, event_pk = (int(part) for part in key.split('-'))
+        if synced.get(key):
+            removed.append(event_pk)
+        else:
+            results[message_id] = (False, error)
+
+    return results, removed
+
+
+BATCH_HANDLERS = {
+    'EMAIL': deliver_emails,
+    'CALENDAR_EVENT': deliver_calendar,
+    'CALENDAR_DELETE': deliver_calendar,
+}
+
+
+def claim_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Lease up to ``batch_size`` due messages to this worker.
+
+    The attempt is counted here, so a message whose outcome is never
+    recorded (the worker died, or the result could not be written) still
+    runs out of attempts. Such a message that comes due again with no
+    attempts left is marked failed instead of being returned.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # skip_locked lets several workers drain the outbox side by side.
+        due = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='PENDING', available_at__lte=now)
+            .order_by('id')[:batch_size]
+        )
+
+        batch = []
+        for message in due:
+            if message.attempts >= max_attempts:
+                message.status = 'FAILED'
+                message.processed_at = now
+                message.last_error = message.last_error or 'Delivery result was never recorded'
+                continue
+            message.attempts += 1
+            message.available_at = now + timedelta(seconds=LEASE_SECONDS)
+            batch.append(message)
+
+        OutboxMessage.objects.bulk_update(due, RESULT_FIELDS)
+    return batch
+
+
+def process_batch(batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Deliver up to ``batch_size`` due messages. Returns (sent, failed).
+
+    No transaction is open while emails and calendar calls go out.
+    """
+    batch = claim_batch(batch_size, max_attempts)
+
+    groups = defaultdict(list)
+    for message in batch:
+        groups[BATCH_HANDLERS[message.kind]].append(message)
+
+    results = []
+    saves = []
+    for handler, messages in groups.items():
+        outcomes, save = handler(messages, max_attempts=max_attempts)
+        results += outcomes
+        if save is not None:
+            saves.append(save)
+
+    with transaction.atomic():
+        for save in saves:
+            save()
+        OutboxMessage.objects.bulk_update(batch, RESULT_FIELDS)
+
+    sent = sum(1 for ok in results if ok)
+    return sent, len(results) - sent
@@ -0,0 +1,194 @@
+"""Appointment reminder delivery and scheduling.
+
+``send_reminder_chunk`` is shared by the one-shot ``send_appointment_reminders``
+command and the resident ``run_reminder_scheduler`` daemon.
+``ReminderScheduler`` keeps upcoming reminder deadlines in a heap so the
+daemon can sleep until exactly the next one is due.
+"""
+import heapq
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+
+from services.email_client import appointment_reminder_payload, send_payloads
+from .models import Booking
+
+logger = logging.getLogger(__name__)
+
+# hours_before -> Booking flag recording that the reminder went out
+REMINDER_FLAGS = {
+    24: 'reminder_sent_24h',
+    1: 'reminder_sent_1h',
+}
+
+RETRY_DELAY = timedelta(minutes=1)
+
+# Bookings are picked up by ``created_at`` with this much overlap, so one
+# committed up to this long after its row was stamped is not missed.
+COMMIT_LAG = timedelta(minutes=5)
+
+
+def starts_between(start, end, prefix='slot__'):
+    """Q matching slots that start in the half-open range ``(start, end]``.
+
+    Reminder queries also filter on ``slot__is_booked=True``, which every
+    booked slot has, so the planner can use ``slot_booked_starts_idx``.
+    """
+    return Q(**{f'{prefix}starts_at__gt': start, f'{prefix}starts_at__lte': end})
+
+
+def dispatch_payloads(payloads, executor=None):
+    """Send payloads as batch requests, in parallel when an executor is given."""
+    size = max(1, settings.EMAIL_SERVICE_BATCH_SIZE)
+    batches = [payloads[i:i + size] for i in range(0, len(payloads), size)]
+
+    mapper = executor.map if executor is not None else map
+    results = []
+    for batch_results in mapper(send_payloads, batches):
+        results.extend(batch_results)
+    return results
+
+
+def send_reminder_chunk(bookings, hours_before, executor=None):
+    """Send one reminder per booking and flag the ones that went out.
+
+    ``bookings`` should be loaded with ``select_related('patient', 'doctor',
+    'slot')``. The flag is set with a single UPDATE. Returns the ids of the
+    bookings that were reminded.
+    """
+    bookings = list(bookings)
+    payloads = [
+        appointment_reminder_payload(booking, hours_before=hours_before)
+        for booking in bookings
+    ]
+    results = dispatch_payloads(payloads, executor)
+
+    sent_ids = [booking.id for booking, ok in zip(bookings, results) if ok]
+    if sent_ids:
+        Booking.objects.filter(id__in=sent_ids).update(**{REMINDER_FLAGS[hours_before]: True})
+    return sent_ids
+
+
+class ReminderScheduler:
+    """In-memory priority queue of upcoming reminder deadlines.
+
+    Only bookings starting within ``horizon`` are held in memory. ``load``
+    is called on every poll and reads just the slice of time that entered
+    the horizon since the previous poll, plus bookings created since the
+    previous poll (less ``COMMIT_LAG``). Ids are not used as a high-water
+    mark: a lower id can commit after a higher one. Bookings read twice
+    are skipped through ``scheduled``. Cancelled bookings are not tracked
+    individually: each due reminder is re-checked against the database
+    right before sending.
+    """
+
+    def __init__(self, horizon=timedelta(hours=25)):
+        self.horizon = horizon
+        self.heap = []
+        self.scheduled = set()
+        self.loaded_at = None
+        self.loaded_until = None
+
+    def __len__(self):
+        return len(self.heap)
+
+    def load(self, now):
+        """Pull bookings that became relevant since the previous call."""
+        until = now + self.horizon
+        pending = Booking.objects.filter(
+            Q(reminder_sent_24h=False) | Q(reminder_sent_1h=False),
+            slot__is_booked=True,
+        ).select_related('slot')
+
+        if self.loaded_until is None:
+            bookings = pending.filter(starts_between(now, until))
+        else:
+            bookings = pending.filter(
+                starts_between(self.loaded_until, until)
+                | (Q(created_at__gte=self.loaded_at - COMMIT_LAG) & starts_between(now, self.loaded_until))
+            )
+
+        added = 0
+        for booking in bookings:
+            added += self.schedule(booking, now)
+
+        self.loaded_at = now
+        self.loaded_until = until
+        return added
+
+    def schedule(self, booking, now):
+        """Push the reminders still owed for ``booking``. Returns how many."""
+        start = booking.slot.starts_at
+        added = 0
+        for hours_before, flag in REMINDER_FLAGS.items():
+            key = (booking.id, hours_before)
+            if getattr(booking, flag) or key in self.scheduled:
+                continue
+            # Too late for the 24h reminder once the 1h one is due.
+            if hours_before == 24 and start - now <= timedelta(hours=1):
+                continue
+            self.push(start - timedelta(hours=hours_before), booking.id, hours_before)
+            added += 1
+        return added
+
+    def push(self, due_at, booking_id, hours_before):
+        heapq.heappush(self.heap, (due_at, booking_id, hours_before))
+        self.scheduled.add((booking_id, hours_before))
+
+    def next_due(self):
+        """Deadline of the earliest pending reminder, or None."""
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """Remove and return due reminders grouped as {hours_before: [booking ids]}."""
+        due = {}
+        while self.heap and self.heap[0][0] <= now:
+            _, booking_id, hours_before = heapq.heappop(self.heap)
+            self.scheduled.discard((booking_id, hours_before))
+            due.setdefault(hours_before, []).append(booking_id)
+        return due
+
+    def run_due(self, now, executor=None, batch_size=500):
+        """Send every reminder that is due. Returns the number sent.
+
+        Reminders the email service did not accept are pushed back and
+        retried after ``RETRY_DELAY`` while the appointment is still ahead.
+        If a chunk raises (e.g. the database is down), it and the chunks not
+        yet sent are pushed back as due before the error propagates.
+        """
+        chunks = [
+            (hours_before, booking_ids[i:i + batch_size])
+            for hours_before, booking_ids in self.pop_due(now).items()
+            for i in range(0, len(booking_ids), batch_size)
+        ]
+        sent = 0
+        for index, (hours_before, chunk) in enumerate(chunks):
+            try:
+                sent += self._run_chunk(chunk, hours_before, now, executor)
+            except Exception:
+                for hours_before, booking_ids in chunks[index:]:
+                    for booking_id in booking_ids:
+                        self.push(now, booking_id, hours_before)
+                raise
+        return sent
+
+    def _run_chunk(self, booking_ids, hours_before, now, executor):
+        flag = REMINDER_FLAGS[hours_before]
+        # Cancelled bookings are gone and already-reminded ones are
+        # flagged, so both drop out here.
+        bookings = Booking.objects.filter(
+            id__in=booking_ids, **{flag: False}
+        ).select_related('patient', 'doctor', 'slot')
+        bookings = [booking for booking in bookings if booking.slot.starts_at > now]
+        if not bookings:
+            return 0
+
+        sent_ids = set(send_reminder_chunk(bookings, hours_before, executor))
+
+        retry_at = now + RETRY_DELAY
+        for booking in bookings:
+            if booking.id not in sent_ids and booking.slot.starts_at > retry_at:
+                self.push(retry_at, booking.id, hours_before)
+        return len(sent_ids)
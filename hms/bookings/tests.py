@@ -0,0 +1,317 @@
+"""Tests for bookings app."""
+import threading
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+import httplib2
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from accounts.models import CustomUser
+from benchmarks.seed import book_directly, make_slots, make_users
+from doctors.models import AvailabilitySlot
+from services import fake_calendar, google_calendar
+from .engine import (
+    PatientAlreadyBooked, SlotUnavailable, book_slot_locking, book_slot_optimistic, cancel_patient_booking,
+)
+from .models import Booking, CalendarEvent, OutboxMessage, WaitlistEntry
+from .outbox import enqueue_booking_cancelled, enqueue_booking_confirmation, process_batch
+from .waitlist import join_waitlist
+
+GOOGLE_TOKEN = {
+    'token': 'access',
+    'refresh_token': 'refresh',
+    'token_uri': 'https://oauth2.googleapis.com/token',
+    'client_id': 'client',
+    'client_secret': 'secret',
+    'scopes': google_calendar.SCOPES,
+    'expiry': None,
+}
+
+
+def tomorrow():
+    return timezone.localdate() + timedelta(days=1)
+
+
+class UnreliableCalendarHttp(fake_calendar.FakeCalendarHttp):
+    """Fake Google transport that drops the next ``failures`` requests."""
+    
+    failures = 0
+    
+    def request(self, uri, *args, **kwargs):
+        if UnreliableCalendarHttp.failures:
+            UnreliableCalendarHttp.failures -= 1
+            raise httplib2.HttpLib2Error('Connection reset')
+        return super().request(uri, *args, **kwargs)
+
+
+def accept_all(payloads):
+    return [True] * len(payloads)
+
+
+def reject_all(payloads):
+    return [False] * len(payloads)
+
+
+@override_settings(GOOGLE_CALENDAR_HTTP_FACTORY='bookings.tests.UnreliableCalendarHttp')
+class OutboxDeliveryTests(TestCase):
+    """``process_batch`` against the fake calendar transport."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        """A doctor with Google connected, a patient without, and a booking."""
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR',
+            google_calendar_token=GOOGLE_TOKEN,
+        )
+        cls.patient = CustomUser.objects.create_user(
+            username='patient@example.com', email='patient@example.com', role='PATIENT'
+        )
+        slot, = make_slots([cls.doctor], 1, tomorrow())
+        cls.booking = Booking.objects.create(patient=cls.patient, doctor=cls.doctor, slot=slot)
+    
+    def setUp(self):
+        """Start from an empty fake calendar and no cached Google services."""
+        fake_calendar.reset()
+        google_calendar._service_cache().clear()
+        UnreliableCalendarHttp.failures = 0
+    
+    def make_due(self):
+        """Let messages waiting for a retry or a lease run now."""
+        OutboxMessage.objects.filter(status='PENDING').update(available_at=timezone.now())
+    
+    def test_delivers_confirmation(self):
+        """Emails are sent and the doctor's calendar event is created."""
+        enqueue_booking_confirmation(self.booking)
+    
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all) as send:
+            self.assertEqual(process_batch(), (4, 0))
+    
+        self.assertEqual(len(send.call_args.args[0]), 2)
+        self.assertFalse(OutboxMessage.objects.exclude(status='SENT').exists())
+        self.assertEqual(set(OutboxMessage.objects.values_list('attempts', flat=True)), {1})
+        # The patient has not connected Google, so only the doctor's event exists.
+        event = CalendarEvent.objects.get()
+        self.assertEqual(event.user_id, self.doctor.id)
+        self.assertIn(event.event_id, fake_calendar.events)
+    
+    def test_cancellation_removes_event(self):
+        """A cancellation deletes the events created for the booking."""
+        enqueue_booking_confirmation(self.booking)
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all):
+            process_batch()
+    
+        enqueue_booking_cancelled(self.booking)
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all):
+            self.assertEqual(process_batch(), (3, 0))
+    
+        self.assertFalse(CalendarEvent.objects.exists())
+        self.assertEqual(fake_calendar.events, {})
+    
+    def test_leased_messages_are_not_delivered_twice(self):
+        """A batch in flight is hidden from other workers."""
+        enqueue_booking_confirmation(self.booking)
+        OutboxMessage.objects.update(attempts=1, available_at=timezone.now() + timedelta(minutes=5))
+    
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all) as send:
+            self.assertEqual(process_batch(), (0, 0))
+        send.assert_not_called()
+    
+    def test_transient_failure_is_retried(self):
+        """A failed calendar call is retried later and then succeeds."""
+        enqueue_booking_confirmation(self.booking)
+        UnreliableCalendarHttp.failures = 1
+    
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all):
+            self.assertEqual(process_batch(), (3, 1))
+    
+        failed = OutboxMessage.objects.get(status='PENDING')
+        self.assertEqual(failed.payload['user_id'], self.doctor.id)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn('Connection reset', failed.last_error)
+        self.assertGreater(failed.available_at, timezone.now())
+        # Not due yet.
+        self.assertEqual(process_batch(), (0, 0))
+    
+        self.make_due()
+        self.assertEqual(process_batch(), (1, 0))
+        failed.refresh_from_db()
+        self.assertEqual((failed.status, failed.attempts, failed.last_error), ('SENT', 2, ''))
+        self.assertTrue(CalendarEvent.objects.filter(user=self.doctor).exists())
+    
+    def test_failed_after_max_attempts(self):
+        """A message that keeps failing is marked failed and left alone."""
+        enqueue_booking_cancelled(self.booking)
+    
+        with mock.patch('bookings.outbox.send_payloads', side_effect=reject_all):
+            for _ in range(3):
+                self.make_due()
+                process_batch(max_attempts=3)
+            self.make_due()
+            self.assertEqual(process_batch(max_attempts=3), (0, 0))
+    
+        email = OutboxMessage.objects.get(kind='EMAIL')
+        self.assertEqual((email.status, email.attempts), ('FAILED', 3))
+        self.assertEqual(email.last_error, 'Email service did not accept message')
+        self.assertIsNotNone(email.processed_at)
+    
+    def test_unrecorded_attempt_counts(self):
+        """A message whose worker died on its last attempt is marked failed."""
+        enqueue_booking_cancelled(self.booking)
+        OutboxMessage.objects.filter(kind='EMAIL').update(attempts=3)
+    
+        with mock.patch('bookings.outbox.send_payloads', side_effect=accept_all) as send:
+            self.assertEqual(process_batch(max_attempts=3), (2, 0))
+    
+        # Only the calendar removals were delivered.
+        send.assert_not_called()
+        self.assertEqual(OutboxMessage.objects.get(kind='EMAIL').status, 'FAILED')
+
+
+class BookingRaceTests(TransactionTestCase):
+    """Many patients racing for one slot end with exactly one booking.
+    
+    Each contender books from its own thread and connection, so this needs
+    a database the threads can share (on SQLite, a file; see
+    ``config.database``).
+    """
+    
+    THREADS = 16
+    
+    def setUp(self):
+        """Create a doctor with two slots and the contending patients."""
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('Threads cannot share an in-memory SQLite database')
+        self.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+        self.slots = make_slots([self.doctor], 2, tomorrow())
+        self.patients = make_users('PATIENT', self.THREADS, 'patient')
+    
+    def race(self, engine, attempts):
+        """Run ``engine(patient, slot_id)`` for every attempt at once; returns outcome counts."""
+        barrier = threading.Barrier(len(attempts))
+        outcomes = Counter()
+        lock = threading.Lock()
+    
+        def contend(patient, slot_id):
+            barrier.wait()
+            try:
+                engine(patient, slot_id)
+                outcome = 'booked'
+            except SlotUnavailable:
+                outcome = 'unavailable'
+            except PatientAlreadyBooked:
+                outcome = 'already_booked'
+            except Exception as e:
+                outcome = f'{type(e).__name__}: {e}'
+            finally:
+                connection.close()
+            with lock:
+                outcomes[outcome] += 1
+    
+        threads = [threading.Thread(target=contend, args=attempt) for attempt in attempts]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+    
+    def assert_one_winner(self, engine):
+        slot = self.slots[0]
+        outcomes = self.race(engine, [(patient, slot.id) for patient in self.patients])
+    
+        self.assertEqual(outcomes, Counter(booked=1, unavailable=self.THREADS - 1))
+        self.assertEqual(Booking.objects.filter(slot=slot).count(), 1)
+        slot.refresh_from_db()
+        self.assertTrue(slot.is_booked)
+        # One confirmation (two emails, two calendar events) for the winner only.
+        self.assertEqual(OutboxMessage.objects.count(), 4)
+    
+    def test_locking_engine(self):
+        self.assert_one_winner(book_slot_locking)
+    
+    def test_optimistic_engine(self):
+        self.assert_one_winner(book_slot_optimistic)
+    
+    def test_optimistic_patient_books_once(self):
+        """A patient racing for two slots gets one, and the other stays free."""
+        patient = self.patients[0]
+        outcomes = self.race(book_slot_optimistic, [(patient, slot.id) for slot in self.slots])
+    
+        self.assertEqual(outcomes, Counter(booked=1, already_booked=1))
+        self.assertEqual(Booking.objects.filter(patient=patient).count(), 1)
+        self.assertEqual(AvailabilitySlot.objects.filter(is_booked=True).count(), 1)
+
+
+@mock.patch('bookings.engine.publish_slot_event')
+class WaitlistTests(TestCase):
+    """Cancelled slots go to the waitlist before anyone else."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        """A booked slot, one elsewhere, and three waiting patients."""
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+        cls.slot, cls.other_slot = make_slots([cls.doctor], 2, tomorrow())
+        cls.holder, cls.booked_elsewhere, cls.first, cls.second = make_users('PATIENT', 4, 'patient')
+        book_directly([cls.holder, cls.booked_elsewhere], [cls.slot, cls.other_slot])
+    
+    def queue(self, *patients, date=None):
+        """Join the waitlist in the given order, a minute apart."""
+        for minutes, patient in enumerate(patients):
+            entry, _ = join_waitlist(patient, self.doctor, date or self.slot.date)
+            WaitlistEntry.objects.filter(pk=entry.pk).update(
+                created_at=timezone.now() - timedelta(hours=1) + timedelta(minutes=minutes)
+            )
+    
+    def test_oldest_waiting_patient_gets_slot(self, publish):
+        """The slot goes to the earliest entry whose patient has no booking."""
+        self.queue(self.booked_elsewhere, self.first, self.second)
+        self.queue(self.first, date=self.slot.date + timedelta(days=1))
+    
+        successor = cancel_patient_booking(self.holder)
+    
+        self.assertEqual((successor.patient, successor.slot), (self.first, self.slot))
+        self.assertEqual(Booking.objects.get(slot=self.slot).patient, self.first)
+        # One booking per patient, so all of their entries are gone.
+        self.assertFalse(WaitlistEntry.objects.filter(patient=self.first).exists())
+        self.assertEqual(
+            set(WaitlistEntry.objects.values_list('patient', flat=True)),
+            {self.booked_elsewhere.id, self.second.id},
+        )
+        self.assertTrue(OutboxMessage.objects.filter(
+            kind='EMAIL',
+            payload__action='BOOKING_CONFIRMATION',
+            payload__recipient_email=self.first.email,
+        ).exists())
+        self.assertTrue(OutboxMessage.objects.filter(
+            kind='CALENDAR_EVENT', payload__booking_id=successor.id,
+        ).exists())
+        # The slot never becomes free.
+        self.slot.refresh_from_db()
+        self.assertTrue(self.slot.is_booked)
+        publish.assert_not_called()
+    
+    def test_released_without_waitlist(self, publish):
+        """With nobody waiting the slot is freed and announced."""
+        self.assertIsNone(cancel_patient_booking(self.holder))
+    
+        self.slot.refresh_from_db()
+        self.assertFalse(self.slot.is_booked)
+        publish.assert_called_once_with('freed', self.slot)
+    
+    def test_past_slot_released(self, publish):
+        """A slot that has already started is not handed out."""
+        past_slot, = make_slots([self.doctor], 1, timezone.localdate() - timedelta(days=1))
+        book_directly([self.second], [past_slot])
+        self.queue(self.first, date=past_slot.date)
+    
+        self.assertIsNone(cancel_patient_booking(self.second))
+    
+        self.assertFalse(Booking.objects.filter(slot=past_slot).exists())
+        past_slot.refresh_from_db()
+        self.assertFalse(past_slot.is_booked)
+        self.assertTrue(WaitlistEntry.objects.filter(patient=self.first).exists())
+        publish.assert_called_once_with('freed', past_slot)
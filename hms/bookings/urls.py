@@ -5,4 +5,6 @@ from . import views
 urlpatterns = [
     path('book/<int:slot_id>/', views.book_appointment, name='book_appointment'),
     path('cancel/', views.cancel_booking, name='cancel_booking'),
+    path('waitlist/join/', views.join_waitlist_view, name='join_waitlist'),
+    path('waitlist/<int:entry_id>/leave/', views.leave_waitlist, name='leave_waitlist'),
 ]
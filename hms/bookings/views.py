@@ -1,79 +1,55 @@
 """Views for bookings app."""
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth.decorators import login_required
-from django.db import transaction
+from asgiref.sync import sync_to_async
+from django.shortcuts import redirect
 from django.contrib import messages
+from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
+from accounts.decorators import async_login_required, async_require_http_methods
 from doctors.models import AvailabilitySlot
-from .models import Booking
-from services.email_client import send_booking_confirmation, send_booking_cancelled
-from services.google_calendar import create_calendar_event
+from .engine import PatientAlreadyBooked, SlotUnavailable, book_slot, cancel_patient_booking
+from .forms import WaitlistForm
+from .models import Booking, WaitlistEntry
+from .waitlist import join_waitlist
 
 
-@login_required(login_url='login')
-@require_http_methods(["POST"])
-def book_appointment(request, slot_id):
-    """Book an appointment - with transaction and locking to prevent race conditions."""
+@async_login_required(login_url='login')
+@async_require_http_methods(["POST"])
+async def book_appointment(request, slot_id):
+    """Book an appointment; the slot is claimed atomically by bookings.engine."""
     
     if not request.user.is_patient():
         messages.error(request, "Only patients can book appointments.")
         return redirect('login')
     
     # Check if patient already has a booking
-    if Booking.objects.filter(patient=request.user).exists():
+    if await Booking.objects.filter(patient=request.user).aexists():
         messages.error(request, "You already have a booking. Cancel it first to book another.")
         return redirect('patient_dashboard')
     
     try:
-        with transaction.atomic():
-            # Use select_for_update() to lock the slot
-            slot = AvailabilitySlot.objects.select_for_update().get(id=slot_id)
-            
-            # Double-check if slot is available
-            if slot.is_booked or not slot.can_be_booked():
-                messages.error(request, "This slot is no longer available.")
-                return redirect('view_slots')
-            
-            # Create booking
-            booking = Booking.objects.create(
-                patient=request.user,
-                doctor=slot.doctor,
-                slot=slot
-            )
-            
-            # Mark slot as booked
-            slot.is_booked = True
-            slot.save()
-            
-            # Send email notification
-            try:
-                send_booking_confirmation(booking)
-            except Exception as e:
-                # Log error but don't fail the booking
-                print(f"Error sending email: {str(e)}")
-            
-            # Create Google Calendar events for both doctor and patient
-            try:
-                create_calendar_event(slot.doctor, booking)
-                create_calendar_event(request.user, booking)
-            except Exception as e:
-                # Log error but don't fail the booking
-                print(f"Error creating calendar event: {str(e)}")
-            
-            messages.success(request, "Appointment booked successfully!")
-            return redirect('patient_dashboard')
+        # The transaction runs in a worker thread; the event loop stays free
+        await sync_to_async(book_slot)(request.user, slot_id)
+        
+        messages.success(request, "Appointment booked successfully!")
+        return redirect('patient_dashboard')
     
     except AvailabilitySlot.DoesNotExist:
         messages.error(request, "Slot not found.")
         return redirect('view_slots')
+    except SlotUnavailable as e:
+        messages.error(request, str(e))
+        return redirect('view_slots')
+    except PatientAlreadyBooked as e:
+        messages.error(request, str(e))
+        return redirect('patient_dashboard')
     except Exception as e:
         messages.error(request, f"Error booking appointment: {str(e)}")
         return redirect('view_slots')
 
 
-@login_required(login_url='login')
-@require_http_methods(["POST"])
-def cancel_booking(request):
+@async_login_required(login_url='login')
+@async_require_http_methods(["POST"])
+async def cancel_booking(request):
     """Cancel a booking."""
     
     if not request.user.is_patient():
@@ -81,25 +57,10 @@ def cancel_booking(request):
         return redirect('login')
     
     try:
-        with transaction.atomic():
-            booking = Booking.objects.select_related('slot').get(patient=request.user)
-            
-            # Send cancellation email before deleting
-            try:
-                send_booking_cancelled(booking)
-            except Exception as e:
-                pass
-            
-            # Mark slot as available
-            slot = booking.slot
-            slot.is_booked = False
-            slot.save()
-            
-            # Delete booking
-            booking.delete()
-            
-            messages.success(request, "Booking cancelled successfully.")
-            return redirect('patient_dashboard')
+        await sync_to_async(cancel_patient_booking)(request.user)
+        
+        messages.success(request, "Booking cancelled successfully.")
+        return redirect('patient_dashboard')
     
     except Booking.DoesNotExist:
         messages.error(request, "No booking found.")
@@ -107,3 +68,47 @@ def cancel_booking(request):
     except Exception as e:
         messages.error(request, f"Error cancelling booking: {str(e)}")
         return redirect('patient_dashboard')
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def join_waitlist_view(request):
+    """Join a doctor's waitlist for a date."""
+    if not request.user.is_patient():
+        messages.error(request, "Only patients can join a waitlist.")
+        return redirect('login')
+    
+    if Booking.objects.filter(patient=request.user).exists():
+        messages.error(request, "You already have a booking. Cancel it first to join a waitlist.")
+        return redirect('patient_dashboard')
+    
+    form = WaitlistForm(request.POST)
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect('view_slots')
+    
+    doctor, date = form.cleaned_data['doctor'], form.cleaned_data['date']
+    _, created = join_waitlist(request.user, doctor, date)
+    if created:
+        messages.success(
+            request,
+            f"You are on the waitlist for Dr. {doctor.get_full_name()} on {date:%b %d, %Y}. "
+            "If a slot is cancelled it will be booked for you."
+        )
+    else:
+        messages.success(request, "You are already on this waitlist.")
+    return redirect('patient_dashboard')
+
+
+@login_required(login_url='login')
+@require_http_methods(["POST"])
+def leave_waitlist(request, entry_id):
+    """Leave a waitlist."""
+    deleted, _ = WaitlistEntry.objects.filter(id=entry_id, patient=request.user).delete()
+    if deleted:
+        messages.success(request, "You have left the waitlist.")
+    else:
+        messages.error(request, "Waitlist entry not found.")
+    return redirect('patient_dashboard')
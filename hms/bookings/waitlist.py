@@ -0,0 +1,53 @@
+"""Waitlist for fully booked doctors.
+
+Patients queue per doctor and date. When a booking on that date is
+cancelled, ``assign_from_waitlist`` books the freed slot for the first
+patient in the queue inside the cancellation transaction, so the slot is
+never released for patients refreshing the slot list to race for.
+"""
+from django.db import IntegrityError, transaction
+
+from .models import Booking, WaitlistEntry
+from .outbox import enqueue_booking_confirmation
+
+# Queue entries tried per cancellation before the slot is released; an
+# entry fails only if its patient booked elsewhere concurrently.
+MAX_CANDIDATES = 5
+
+
+def join_waitlist(patient, doctor, date):
+    """Queue ``patient`` for ``doctor`` on ``date``; returns ``(entry, created)``."""
+    return WaitlistEntry.objects.get_or_create(patient=patient, doctor=doctor, date=date)
+
+
+def assign_from_waitlist(slot, doctor):
+    """Book ``slot`` for the first waitlisted patient who has no booking.
+
+    Must run inside the cancellation transaction, after the old booking is
+    deleted. Returns the new booking, or None if nobody is waiting. The
+    patient's other waitlist entries are dropped (one booking per patient)
+    and their confirmation is queued in the outbox.
+    """
+    if not slot.is_future_slot():
+        return None
+
+    queue = (
+        WaitlistEntry.objects
+        .select_for_update(of=('self',))
+        .filter(doctor_id=slot.doctor_id, date=slot.date, patient__appointment__isnull=True)
+        .select_related('patient')
+        .order_by('created_at', 'id')
+    )
+    for entry in queue[:MAX_CANDIDATES]:
+        try:
+            # Savepoint: the patient may have booked another slot since
+            # the queue was read.
+            with transaction.atomic():
+                booking = Booking.objects.create(patient=entry.patient, doctor=doctor, slot=slot)
+        except IntegrityError:
+            continue
+
+        WaitlistEntry.objects.filter(patient=entry.patient).delete()
+        enqueue_booking_confirmation(booking)
+        return booking
+    return None
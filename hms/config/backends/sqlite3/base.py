@@ -0,0 +1,28 @@
+"""SQLite backend tuned for local runs with several threads or processes.
+
+WAL mode lets readers carry on while a booking transaction writes, and
+``synchronous=NORMAL`` is safe with WAL (only the last transactions can be
+lost, on power failure). Django 4.2 has no ``init_command`` for SQLite, so
+the pragmas are issued on every new connection here.
+
+Transactions start with ``BEGIN IMMEDIATE``, which takes the write lock up
+front. A plain ``BEGIN`` defers it to the first write, and a transaction
+that read before another writer committed then fails with "database is
+locked" at once instead of waiting for the busy ``timeout``. Django 5.1's
+``transaction_mode = "IMMEDIATE"`` option does the same.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite connection in WAL mode with immediate transactions."""
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        if not self.is_in_memory_db():
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
@@ -0,0 +1,85 @@
+"""Send selected read-only views to database replicas.
+
+Reads go to a replica only while a view wrapped in ``read_from_replica``
+runs, so bookings, cancellations and everything else keep using the
+primary. Replica reads are also skipped:
+
+- inside a transaction on the primary, so locked reads see current rows;
+- for a while after the browser made a write (``PrimaryPinMiddleware``
+  sets ``REPLICA_PIN_COOKIE``), so a patient sees their own booking on the
+  dashboard despite replication lag;
+- inside ``primary_reads()``, for results that are cached afterwards.
+"""
+import asyncio
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_PIN_COOKIE = 'hms_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """Route reads to a random replica while ``read_from_replica`` is active."""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        # Explicit, otherwise instances read from a replica would be saved
+        # back to it.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def read_from_replica(view_func):
+    """Serve the view's reads from a replica unless the client is pinned."""
+    def pinned(request):
+        return REPLICA_PIN_COOKIE in request.COOKIES
+
+    if asyncio.iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if pinned(request):
+                return await view_func(request, *args, **kwargs)
+            token = _use_replica.set(True)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if pinned(request):
+            return view_func(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside a ``read_from_replica`` view."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
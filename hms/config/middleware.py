@@ -0,0 +1,155 @@
+"""Project-wide middleware and the metrics endpoint."""
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+from services import metrics, ratelimit
+from .db_routers import REPLICA_PIN_COOKIE
+
+logger = logging.getLogger('hms.requests')
+
+
+class RequestMetricsMiddleware:
+    """Record latency, SQL queries and outbound calls for every request.
+
+    Each request is logged as one JSON line on the ``hms.requests`` logger
+    and added to the counters served by ``metrics_view``. Should be first in
+    ``MIDDLEWARE`` so the numbers cover the whole stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        metrics.install_query_wrapper()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = metrics.begin_request()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = metrics.end_request(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        token = metrics.begin_request()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = metrics.end_request(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, seconds, stats):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.record_request(view, request.method, response.status_code, seconds, stats)
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(seconds * 1000, 2),
+            'db_queries': stats.queries,
+            'db_time_ms': round(stats.query_seconds * 1000, 2),
+            'outbound': {
+                service: {'calls': calls, 'time_ms': round(call_seconds * 1000, 2)}
+                for service, (calls, call_seconds) in stats.calls.items()
+            },
+        }))
+
+
+class PrimaryPinMiddleware:
+    """Pin a browser to the primary database for a while after a write.
+
+    Any non-safe request (booking, cancelling, editing slots, logging in)
+    sets ``REPLICA_PIN_COOKIE`` for ``DATABASE_REPLICA_PIN_SECONDS``, which
+    ``read_from_replica`` views honour. Does nothing without replicas.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.pin(request, await self.get_response(request))
+
+    def pin(self, request, response):
+        if settings.DATABASE_REPLICAS and request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1',
+                max_age=settings.DATABASE_REPLICA_PIN_SECONDS, httponly=True, samesite='Lax',
+            )
+        return response
+
+
+class RateLimitMiddleware:
+    """Apply the token-bucket limits in ``RATE_LIMITS`` by URL name.
+
+    Runs as ``process_view`` so the URL is already resolved. Requests to
+    URLs without a rule only pay for a dict lookup.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Django runs a sync process_view in a thread under ASGI.
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        rule = ratelimit.rules().get(request.resolver_match.url_name)
+        if rule is None:
+            return None
+        return ratelimit.check(request, rule)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        rule = ratelimit.rules().get(request.resolver_match.url_name)
+        if rule is None or not ratelimit.applies(request, rule):
+            return None
+        return await sync_to_async(ratelimit.check)(request, rule)
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, guarded by ``METRICS_TOKEN``.
+
+    Without a token the endpoint is only open while ``DEBUG`` is on.
+    """
+    token = settings.METRICS_TOKEN
+    if not token and not settings.DEBUG:
+        return HttpResponseForbidden()
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
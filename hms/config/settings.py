@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -10,6 +11,8 @@ SECRET_KEY = os.getenv('SECRET_KEY', 'django-insecure-dev-key-only-for-developme
 
 DEBUG = os.getenv('DEBUG', 'True') == 'True'
 
+TESTING = sys.argv[1:2] == ['test']
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',')
 
 INSTALLED_APPS = [
@@ -19,6 +22,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
     'accounts',
     'doctors',
     'patients',
@@ -26,11 +30,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.RequestMetricsMiddleware',
+    'config.middleware.PrimaryPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'config.middleware.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -55,28 +62,62 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
-# SQLite for development
-DATABASES = {
+# Database from DATABASE_URL (see config/database.py); SQLite in WAL mode
+# by default, e.g. postgres://hms:secret@db:5432/hms_db for production.
+# Connections are kept for DB_CONN_MAX_AGE seconds and checked before reuse.
+# Under an ASGI server set DB_CONN_MAX_AGE=0 and pool with PgBouncer.
+from .database import database_settings
+
+DATABASE_REPLICA_URLS = [url for url in os.getenv('DATABASE_REPLICA_URLS', '').split(',') if url]
+
+DATABASES = database_settings(
+    os.getenv('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
+    DATABASE_REPLICA_URLS,
+    BASE_DIR,
+    conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '60')),
+    conn_health_checks=os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+)
+
+# Read replicas serve the slot, doctor list and dashboard views (see
+# config/db_routers.py). After a write the browser reads from the primary
+# for DATABASE_REPLICA_PIN_SECONDS, to cover replication lag.
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['config.db_routers.ReplicaRouter']
+DATABASE_REPLICA_PIN_SECONDS = int(os.getenv('DATABASE_REPLICA_PIN_SECONDS', '10'))
+
+# Cache (local memory by default; use a shared backend such as
+# django.core.cache.backends.filebased.FileBasedCache with several workers
+# so dashboard invalidations are seen by every process)
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'hms-cache'),
     }
 }
 
-# PostgreSQL configuration (uncomment for production)
-# DATABASES = {
-#     'default': {
-#          'ENGINE': 'django.db.backends.postgresql',
-#          'NAME': os.getenv('DB_NAME', 'hms_db'),
-#          'USER': os.getenv('DB_USER', 'postgres'),
-#          'PASSWORD': os.getenv('DB_PASSWORD', ''),
-#          'HOST': os.getenv('DB_HOST', 'localhost'),
-#          'PORT': os.getenv('DB_PORT', '5432'),
-#      }
-#  }
+DOCTOR_SUMMARY_CACHE_TIMEOUT = int(os.getenv('DOCTOR_SUMMARY_CACHE_TIMEOUT', '300'))
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# request.user is loaded from a cached snapshot (see accounts/backends.py);
+# it holds the password hash for the session check but no OAuth tokens.
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_ALIAS = 'default'
+USER_CACHE_TIMEOUT = int(os.getenv('USER_CACHE_TIMEOUT', '300'))
+
+# Session storage: 'cached_db' (cache in front of the database table),
+# 'cache' (cache only; sessions are lost if it is cleared), 'db', or
+# 'signed_cookies' (no server-side storage; the data is signed, not
+# encrypted). Cache-backed profiles need a shared CACHE_BACKEND when
+# several processes serve requests.
+SESSION_PROFILE = os.getenv('SESSION_PROFILE', 'cached_db')
+SESSION_ENGINE = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_PROFILE]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -123,7 +164,70 @@ GOOGLE_REDIRECT_URI = os.getenv(
     'GOOGLE_REDIRECT_URI'
 )
 
+# Dotted path to an httplib2-compatible class used instead of the real
+# Google transport, e.g. 'services.fake_calendar.FakeCalendarHttp' for local runs.
+GOOGLE_CALENDAR_HTTP_FACTORY = os.getenv('GOOGLE_CALENDAR_HTTP_FACTORY') or None
+
 # Email service settings
 EMAIL_SERVICE_URL = os.getenv(
     'EMAIL_SERVICE_URL'
 )
+
+EMAIL_SERVICE_TIMEOUT = float(os.getenv('EMAIL_SERVICE_TIMEOUT', '5'))
+EMAIL_SERVICE_POOL_SIZE = int(os.getenv('EMAIL_SERVICE_POOL_SIZE', '10'))
+EMAIL_SERVICE_MAX_RETRIES = int(os.getenv('EMAIL_SERVICE_MAX_RETRIES', '3'))
+EMAIL_SERVICE_BACKOFF_FACTOR = float(os.getenv('EMAIL_SERVICE_BACKOFF_FACTOR', '0.5'))
+EMAIL_SERVICE_BATCH_SIZE = int(os.getenv('EMAIL_SERVICE_BATCH_SIZE', '50'))
+
+# Booking engine: 'locking' (SELECT ... FOR UPDATE) or 'optimistic'
+# (conditional UPDATE on the slot). See bookings/engine.py.
+BOOKING_ENGINE = os.getenv('BOOKING_ENGINE', 'locking')
+BOOKING_MAX_RETRIES = int(os.getenv('BOOKING_MAX_RETRIES', '3'))
+
+# Live slot updates over server-sent events (see services/slot_events.py).
+# Use services.slot_events.CacheBroker with a shared cache when running
+# several processes.
+SLOT_EVENTS_BROKER = os.getenv('SLOT_EVENTS_BROKER', 'services.slot_events.LocalBroker')
+SLOT_EVENTS_POLL_INTERVAL = float(os.getenv('SLOT_EVENTS_POLL_INTERVAL', '0.5'))
+SLOT_EVENTS_KEEPALIVE = float(os.getenv('SLOT_EVENTS_KEEPALIVE', '15'))
+SLOT_EVENTS_MAX_SECONDS = int(os.getenv('SLOT_EVENTS_MAX_SECONDS', '300'))
+
+# Token-bucket rate limits (see services/ratelimit.py), by URL name. 'rate'
+# is requests per second/minute/hour, 'burst' the bucket size (defaults to
+# the count in 'rate'), 'key' is 'user' (falls back to IP) or 'ip'.
+# Buckets are per process by default; 'cache' shares them between workers
+# through RATE_LIMIT_CACHE, at two cache round trips per limited request.
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # or 'cache'
+RATE_LIMIT_CACHE = 'default'
+# Behind a proxy, e.g. HTTP_X_FORWARDED_FOR
+RATE_LIMIT_IP_META = os.getenv('RATE_LIMIT_IP_META', 'REMOTE_ADDR')
+RATE_LIMITS = {
+    'book_appointment': {'rate': '10/m', 'burst': 3, 'key': 'user'},
+    'login': {'rate': '10/m', 'key': 'ip'},
+    'doctor_signup': {'rate': '10/h', 'key': 'ip'},
+    'patient_signup': {'rate': '10/h', 'key': 'ip'},
+}
+
+# Request metrics (see config/middleware.py). When set, /metrics requires
+# "Authorization: Bearer <METRICS_TOKEN>"; with DEBUG off it must be set, or
+# /metrics answers 403 to everyone.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'hms.requests': {
+            'handlers': ['console'],
+            # One line per request would bury the test results.
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
@@ -3,6 +3,7 @@ from django.contrib import admin
 from django.urls import path, include
 from accounts.views import home
 from accounts.views import google_calendar_callback
+from .middleware import metrics_view
 
 urlpatterns = [
     path('', home, name='home'),
@@ -12,5 +13,6 @@ urlpatterns = [
     path('patients/', include('patients.urls')),
     path('bookings/', include('bookings.urls')),
     path('google/callback/', google_calendar_callback, name='google_calendar_callback'),
+    path('metrics', metrics_view, name='metrics'),
 
 ]
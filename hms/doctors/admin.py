@@ -1,5 +1,6 @@
 """Admin configuration for doctors app."""
 from django.contrib import admin
+from accounts.paginators import EstimatedCountPaginator
 from .models import AvailabilitySlot
 
 
@@ -8,7 +9,13 @@ class AvailabilitySlotAdmin(admin.ModelAdmin):
     """Admin for AvailabilitySlot model."""
     
     list_display = ('doctor', 'date', 'start_time', 'end_time', 'is_booked')
-    list_filter = ('date', 'is_booked', 'doctor')
-    search_fields = ('doctor__email', 'date')
+    list_select_related = ('doctor',)
+    # Filtering by doctor is done through search; a doctor filter would
+    # list every doctor in the sidebar.
+    list_filter = ('is_booked',)
+    search_fields = ('doctor__email',)
     date_hierarchy = 'date'
+    autocomplete_fields = ('doctor',)
     readonly_fields = ('created_at', 'updated_at')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -1,14 +1,28 @@
 """Forms for doctors app."""
 from django import forms
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
-from datetime import datetime
+from datetime import datetime, timedelta
+from .intervals import SlotIntervalIndex, day_bounds
 from .models import AvailabilitySlot
 
 
+def format_time(moment, day_end=None):
+    """``HH:MM`` in the default time zone; the end of the day is ``24:00``."""
+    if moment == day_end:
+        return "24:00"
+    return f"{timezone.localtime(moment, timezone.get_default_timezone()):%H:%M}"
+
+
 class AvailabilitySlotForm(forms.ModelForm):
     """Form for creating availability slots."""
     
+    def __init__(self, *args, doctor=None, **kwargs):
+        """Initialize form for ``doctor``."""
+        super().__init__(*args, **kwargs)
+        self.doctor = doctor
+    
     class Meta:
         """Meta options for AvailabilitySlotForm."""
         model = AvailabilitySlot
@@ -34,5 +48,173 @@ class AvailabilitySlotForm(forms.ModelForm):
             # Check if start time is before end time
             if start_time >= end_time:
                 raise ValidationError("Start time must be before end time.")
+            
+            # Check for overlaps with the doctor's other slots that day
+            if self.doctor is not None:
+                slot = AvailabilitySlot(date=date, start_time=start_time, end_time=end_time)
+                slot.sync_datetimes()
+                day_start, day_end = day_bounds(date)
+                index = SlotIntervalIndex.for_doctor(self.doctor, day_start, day_end)
+                conflicts = index.overlapping(slot.starts_at, slot.ends_at)
+                if conflicts:
+                    shown = ', '.join(
+                        f"{existing.start_time:%H:%M}-{existing.end_time:%H:%M}" for existing in conflicts
+                    )
+                    gaps = index.free_gaps(day_start, day_end, min_length=slot.ends_at - slot.starts_at)
+                    free = ', '.join(f"{format_time(start)}-{format_time(end, day_end)}" for start, end in gaps)
+                    message = f"This slot overlaps your existing slots on {date}: {shown}."
+                    if free:
+                        message += f" Free times that fit it: {free}."
+                    raise ValidationError(message)
         
         return cleaned_data
+
+
+class RecurringAvailabilityForm(forms.Form):
+    """Form for publishing a recurring schedule of equal-length slots."""
+    
+    WEEKDAY_CHOICES = (
+        ('0', 'Monday'),
+        ('1', 'Tuesday'),
+        ('2', 'Wednesday'),
+        ('3', 'Thursday'),
+        ('4', 'Friday'),
+        ('5', 'Saturday'),
+        ('6', 'Sunday'),
+    )
+    
+    MAX_DAYS = 92
+    MAX_SLOTS = 2000
+    
+    date_from = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}))
+    weekdays = forms.MultipleChoiceField(
+        choices=WEEKDAY_CHOICES,
+        widget=forms.CheckboxSelectMultiple,
+        initial=['0', '1', '2', '3', '4'],
+    )
+    start_time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}))
+    end_time = forms.TimeField(widget=forms.TimeInput(attrs={'type': 'time'}))
+    slot_minutes = forms.IntegerField(min_value=5, max_value=480, initial=15, label="Slot length (minutes)")
+    exclusions = forms.CharField(
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 3, 'placeholder': 'YYYY-MM-DD, one per line or comma separated'}),
+        help_text="Dates to skip, e.g. holidays",
+    )
+    
+    def __init__(self, *args, doctor=None, **kwargs):
+        """Initialize form for ``doctor``."""
+        super().__init__(*args, **kwargs)
+        self.doctor = doctor
+        self.slots = []
+    
+    def clean_exclusions(self):
+        """Parse excluded dates."""
+        raw = self.cleaned_data.get('exclusions') or ''
+        dates = set()
+        for value in raw.replace(',', '\n').split():
+            try:
+                dates.add(datetime.strptime(value, '%Y-%m-%d').date())
+            except ValueError:
+                raise ValidationError(f"Invalid date: {value}")
+        return dates
+    
+    def clean(self):
+        """Validate form data and expand it into slots."""
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        start_time = cleaned_data.get('start_time')
+        end_time = cleaned_data.get('end_time')
+        slot_minutes = cleaned_data.get('slot_minutes')
+        weekdays = cleaned_data.get('weekdays')
+        
+        if not all([date_from, date_to, start_time, end_time, slot_minutes, weekdays]):
+            return cleaned_data
+        
+        if date_from < timezone.now().date():
+            raise ValidationError("Slot dates must be in the future.")
+        
+        if date_from > date_to:
+            raise ValidationError("Start date must not be after end date.")
+        
+        if (date_to - date_from).days >= self.MAX_DAYS:
+            raise ValidationError(f"Schedules can span at most {self.MAX_DAYS} days.")
+        
+        if start_time >= end_time:
+            raise ValidationError("Start time must be before end time.")
+        
+        self.slots = self.expand(
+            date_from, date_to, {int(day) for day in weekdays},
+            cleaned_data.get('exclusions') or set(),
+            start_time, end_time, timedelta(minutes=slot_minutes),
+        )
+        
+        if not self.slots:
+            raise ValidationError("This schedule does not produce any slots.")
+        
+        if len(self.slots) > self.MAX_SLOTS:
+            raise ValidationError(f"This schedule produces {len(self.slots)} slots; the limit is {self.MAX_SLOTS}.")
+        
+        conflicts = self.find_conflicts(self.slots)
+        if conflicts:
+            shown = ', '.join(
+                f"{slot.date} {slot.start_time:%H:%M}-{slot.end_time:%H:%M}" for slot in conflicts[:5]
+            )
+            more = f" and {len(conflicts) - 5} more" if len(conflicts) > 5 else ""
+            raise ValidationError(f"Overlaps existing slots: {shown}{more}.")
+        
+        return cleaned_data
+    
+    def expand(self, date_from, date_to, weekdays, exclusions, start_time, end_time, length):
+        """Build unsaved slots for every matching day, in start order.
+        
+        Slots that have already started (earlier today) are left out.
+        """
+        slots = []
+        day = date_from
+        while day <= date_to:
+            if day.weekday() in weekdays and day not in exclusions:
+                start = datetime.combine(day, start_time)
+                day_end = datetime.combine(day, end_time)
+                while start + length <= day_end:
+                    slot = AvailabilitySlot(
+                        doctor=self.doctor,
+                        date=day,
+                        start_time=start.time(),
+                        end_time=(start + length).time(),
+                    )
+                    slot.sync_datetimes()
+                    if slot.is_future_slot():
+                        slots.append(slot)
+                    start += length
+            day += timedelta(days=1)
+        return slots
+    
+    def find_conflicts(self, slots):
+        """Existing slots of the doctor that overlap any new slot (one query)."""
+        index = SlotIntervalIndex.for_doctor(self.doctor, slots[0].starts_at, slots[-1].ends_at)
+        
+        conflicts = {}
+        for slot in slots:
+            if index.overlaps(slot.starts_at, slot.ends_at):
+                for existing in index.overlapping(slot.starts_at, slot.ends_at):
+                    conflicts[existing.id] = existing
+        return sorted(conflicts.values(), key=lambda existing: existing.starts_at)
+    
+    def save(self):
+        """Insert all expanded slots in one bulk statement; returns how many were new.
+        
+        Slots added by a concurrent request since validation are skipped by
+        the unique constraint, so the count comes from the table rather
+        than from ``bulk_create``.
+        """
+        in_range = AvailabilitySlot.objects.filter(
+            doctor=self.doctor,
+            starts_at__gte=self.slots[0].starts_at,
+            starts_at__lt=self.slots[-1].ends_at,
+        )
+        with transaction.atomic():
+            before = in_range.count()
+            AvailabilitySlot.objects.bulk_create(self.slots, ignore_conflicts=True)
+            return in_range.count() - before
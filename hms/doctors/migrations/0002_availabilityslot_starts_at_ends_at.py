@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:04
+
+from datetime import datetime
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_datetimes(apps, schema_editor):
+    AvailabilitySlot = apps.get_model('doctors', 'AvailabilitySlot')
+    tz = timezone.get_default_timezone()
+    batch = []
+    for slot in AvailabilitySlot.objects.only('date', 'start_time', 'end_time').iterator(chunk_size=1000):
+        slot.starts_at = timezone.make_aware(datetime.combine(slot.date, slot.start_time), tz)
+        slot.ends_at = timezone.make_aware(datetime.combine(slot.date, slot.end_time), tz)
+        batch.append(slot)
+        if len(batch) >= 1000:
+            AvailabilitySlot.objects.bulk_update(batch, ['starts_at', 'ends_at'])
+            batch = []
+    if batch:
+        AvailabilitySlot.objects.bulk_update(batch, ['starts_at', 'ends_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='availabilityslot',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, help_text='date + end_time in the default time zone, kept in sync on save', null=True),
+        ),
+        migrations.AddField(
+            model_name='availabilityslot',
+            name='starts_at',
+            field=models.DateTimeField(editable=False, help_text='date + start_time in the default time zone, kept in sync on save', null=True),
+        ),
+        migrations.RunPython(backfill_datetimes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='availabilityslot',
+            name='ends_at',
+            field=models.DateTimeField(editable=False, help_text='date + end_time in the default time zone, kept in sync on save'),
+        ),
+        migrations.AlterField(
+            model_name='availabilityslot',
+            name='starts_at',
+            field=models.DateTimeField(editable=False, help_text='date + start_time in the default time zone, kept in sync on save'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(fields=['doctor', 'starts_at'], name='slot_doctor_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(condition=models.Q(('is_booked', False)), fields=['starts_at'], name='slot_free_starts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(condition=models.Q(('is_booked', True)), fields=['starts_at'], name='slot_booked_starts_idx'),
+        ),
+    ]
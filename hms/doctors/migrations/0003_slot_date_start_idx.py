@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('doctors', '0002_availabilityslot_starts_at_ends_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='availabilityslot',
+            index=models.Index(fields=['-date', 'start_time'], name='slot_date_start_idx'),
+        ),
+    ]
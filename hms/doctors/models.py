@@ -1,5 +1,7 @@
 """Models for doctors app."""
+from datetime import datetime
 from django.db import models
+from django.db.models import Q
 from django.utils import timezone
 from accounts.models import CustomUser
 
@@ -16,6 +18,14 @@ class AvailabilitySlot(models.Model):
     date = models.DateField()
     start_time = models.TimeField()
     end_time = models.TimeField()
+    starts_at = models.DateTimeField(
+        editable=False,
+        help_text="date + start_time in the default time zone, kept in sync on save"
+    )
+    ends_at = models.DateTimeField(
+        editable=False,
+        help_text="date + end_time in the default time zone, kept in sync on save"
+    )
     is_booked = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -29,6 +39,21 @@ class AvailabilitySlot(models.Model):
         unique_together = ('doctor', 'date', 'start_time', 'end_time')
         indexes = [
             models.Index(fields=['doctor', 'date', 'is_booked']),
+            models.Index(fields=['doctor', 'starts_at'], name='slot_doctor_starts_idx'),
+            # Default ordering and the admin date hierarchy.
+            models.Index(fields=['-date', 'start_time'], name='slot_date_start_idx'),
+            # Slot browsing only ever reads free slots and reminder scans
+            # only booked ones, so each gets a partial index.
+            models.Index(
+                fields=['starts_at'],
+                condition=Q(is_booked=False),
+                name='slot_free_starts_idx',
+            ),
+            models.Index(
+                fields=['starts_at'],
+                condition=Q(is_booked=True),
+                name='slot_booked_starts_idx',
+            ),
         ]
     
     def __str__(self):
@@ -36,11 +61,23 @@ class AvailabilitySlot(models.Model):
         status = "Booked" if self.is_booked else "Available"
         return f"{self.doctor.email} - {self.date} {self.start_time}-{self.end_time} ({status})"
     
+    def save(self, *args, **kwargs):
+        """Save slot, keeping starts_at/ends_at in sync with date and times."""
+        self.sync_datetimes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'date', 'start_time', 'end_time'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'starts_at', 'ends_at'}
+        super().save(*args, **kwargs)
+    
+    def sync_datetimes(self):
+        """Derive starts_at/ends_at; call before bulk_create, which skips save()."""
+        tz = timezone.get_default_timezone()
+        self.starts_at = timezone.make_aware(datetime.combine(self.date, self.start_time), tz)
+        self.ends_at = timezone.make_aware(datetime.combine(self.date, self.end_time), tz)
+    
     def is_future_slot(self):
         """Check if slot is in the future."""
-        from datetime import datetime
-        slot_datetime = datetime.combine(self.date, self.start_time)
-        return timezone.make_aware(slot_datetime) > timezone.now()
+        return self.starts_at > timezone.now()
     
     def can_be_booked(self):
         """Check if slot can be booked."""
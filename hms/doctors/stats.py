@@ -0,0 +1,27 @@
+"""Aggregated slot and booking counts for doctors."""
+from django.db.models import Count, Q
+from .models import AvailabilitySlot
+
+
+class DoctorStats:
+    """Slot and booking counts computed with conditional aggregates.
+    
+    Every count comes out of one query over ``AvailabilitySlot``: bookings
+    are counted through the slot's reverse one-to-one ``booking`` relation,
+    since each booking holds exactly one of the doctor's slots.
+    """
+    
+    @staticmethod
+    def expressions():
+        """Conditional count expressions over AvailabilitySlot."""
+        return {
+            'slots_count': Count('id'),
+            'booked_slots_count': Count('id', filter=Q(is_booked=True)),
+            'available_slots_count': Count('id', filter=Q(is_booked=False)),
+            'total_bookings': Count('booking'),
+        }
+    
+    @classmethod
+    def for_doctor(cls, doctor):
+        """Dict of counts for one doctor, in a single query."""
+        return AvailabilitySlot.objects.filter(doctor=doctor).aggregate(**cls.expressions())
@@ -0,0 +1,48 @@
+"""Cached per-doctor dashboard summary.
+
+The summary is stored in Django's cache framework and dropped whenever a
+doctor's slots or bookings change (see ``invalidate_doctor_summary``), so
+under normal traffic a dashboard load is a single cache hit. Invalidation
+runs after the surrounding transaction commits, so a concurrent dashboard
+load cannot re-cache data from before the change. For the same reason
+the summary is always built from the primary database, never a replica.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from bookings.models import Booking
+from config.db_routers import primary_reads
+from .stats import DoctorStats
+
+
+def summary_cache_key(doctor_id):
+    return f"doctor_summary:{doctor_id}"
+
+
+def build_doctor_summary(doctor):
+    """Compute the dashboard summary from the database (two queries)."""
+    summary = DoctorStats.for_doctor(doctor)
+    summary['recent_bookings'] = list(
+        Booking.objects.filter(doctor=doctor)
+        .select_related('patient', 'slot')
+        .order_by('-created_at')[:5]
+    )
+    return summary
+
+
+async def aget_doctor_summary(doctor):
+    """Return the cached summary for ``doctor``, building it on a miss."""
+    key = summary_cache_key(doctor.id)
+    summary = await cache.aget(key)
+    if summary is None:
+        with primary_reads():
+            summary = await sync_to_async(build_doctor_summary)(doctor)
+        await cache.aset(key, summary, settings.DOCTOR_SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_doctor_summary(doctor_id):
+    """Drop the cached summary once the current transaction commits."""
+    key = summary_cache_key(doctor_id)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -0,0 +1,293 @@
+"""Tests for doctors app."""
+from datetime import date, datetime, time, timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from accounts.models import CustomUser
+from benchmarks.seed import book_directly, make_slots, make_users
+from .forms import AvailabilitySlotForm, RecurringAvailabilityForm
+from .intervals import SlotIntervalIndex
+from .models import AvailabilitySlot
+from .stats import DoctorStats
+from .summary import summary_cache_key
+
+
+class DoctorDashboardQueryTests(TestCase):
+    """The dashboard and admin counts must not grow with the doctor's data."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        """Create a doctor with a day of slots and one booking."""
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+        cls.admin = CustomUser.objects.create_superuser(
+            username='admin@example.com', email='admin@example.com', password='!'
+        )
+        cls.slots = make_slots([cls.doctor], 12, timezone.localdate() + timedelta(days=1))
+        cls.patients = make_users('PATIENT', 8, 'patient')
+        book_directly(cls.patients[:1], cls.slots[:1])
+    
+    def setUp(self):
+        """Log in and warm the session and user caches."""
+        cache.clear()
+        self.client.force_login(self.doctor)
+        self.client.get(reverse('doctor_dashboard'))
+        cache.delete(summary_cache_key(self.doctor.id))
+    
+    def test_stats_in_one_query(self):
+        """All counts come from one conditional aggregate."""
+        book_directly(self.patients[1:3], self.slots[1:3])
+    
+        with self.assertNumQueries(1):
+            stats = DoctorStats.for_doctor(self.doctor)
+    
+        self.assertEqual(stats, {
+            'slots_count': 12,
+            'booked_slots_count': 3,
+            'available_slots_count': 9,
+            'total_bookings': 3,
+        })
+    
+    def test_dashboard_queries(self):
+        """A summary rebuild costs the aggregate and recent bookings, whatever the size."""
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('doctor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+    
+        book_directly(self.patients[1:], self.slots[1:])
+        cache.delete(summary_cache_key(self.doctor.id))
+    
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('doctor_dashboard'))
+        self.assertEqual(response.context['total_bookings'], 8)
+        self.assertEqual(len(response.context['recent_bookings']), 5)
+    
+    def test_cached_dashboard(self):
+        """Once the summary is cached the dashboard makes no queries."""
+        self.client.get(reverse('doctor_dashboard'))
+    
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('doctor_dashboard'))
+        self.assertEqual(response.status_code, 200)
+    
+    def test_admin_doctor_stats(self):
+        """The admin change page shows the counts without per-row queries."""
+        self.client.force_login(self.admin)
+        url = reverse('admin:accounts_customuser_change', args=[self.doctor.id])
+        self.client.get(url)
+    
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        book_directly(self.patients[1:], self.slots[1:])
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+    
+        self.assertContains(response, '12 slots (8 booked, 4 available), 8 bookings')
+        self.assertEqual(len(large), len(small))
+
+
+# A Monday
+MONDAY = date(2030, 1, 7)
+
+
+def at(day, hour, minute=0):
+    """An aware datetime in the default time zone."""
+    return timezone.make_aware(datetime.combine(day, time(hour, minute)))
+
+
+@mock.patch('django.utils.timezone.now', return_value=at(MONDAY, 8))
+class RecurringAvailabilityFormTests(TestCase):
+    """Expanding a recurring schedule into slots."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+    
+    def form(self, **data):
+        """A bound form for a week of weekday mornings, with ``data`` overrides."""
+        data = {
+            'date_from': MONDAY,
+            'date_to': MONDAY + timedelta(days=6),
+            'weekdays': ['0', '1', '2', '3', '4'],
+            'start_time': '09:00',
+            'end_time': '10:00',
+            'slot_minutes': 30,
+            'exclusions': '',
+            **data,
+        }
+        return RecurringAvailabilityForm(data, doctor=self.doctor)
+    
+    def starts(self, form):
+        return [(slot.date, slot.start_time) for slot in form.slots]
+    
+    def test_expands_weekdays(self, now):
+        """Each chosen weekday gets back-to-back slots; a partial slot at the end is dropped."""
+        form = self.form(weekdays=['0', '2'], end_time='10:15')
+        self.assertTrue(form.is_valid(), form.errors)
+    
+        wednesday = MONDAY + timedelta(days=2)
+        self.assertEqual(self.starts(form), [
+            (MONDAY, time(9, 0)), (MONDAY, time(9, 30)),
+            (wednesday, time(9, 0)), (wednesday, time(9, 30)),
+        ])
+        self.assertEqual(form.slots[-1].ends_at, at(wednesday, 10))
+    
+    def test_exclusions(self, now):
+        """Excluded dates get no slots."""
+        tuesday, friday = MONDAY + timedelta(days=1), MONDAY + timedelta(days=4)
+        form = self.form(exclusions=f'{tuesday}, {friday}')
+        self.assertTrue(form.is_valid(), form.errors)
+    
+        self.assertEqual(len(form.slots), 6)
+        self.assertFalse({tuesday, friday} & {slot.date for slot in form.slots})
+    
+        self.assertFalse(self.form(exclusions='next tuesday').is_valid())
+    
+    def test_skips_started_slots(self, now):
+        """A schedule starting today only gets the slots that have not started."""
+        now.return_value = at(MONDAY, 9, 10)
+        form = self.form(date_to=MONDAY)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(self.starts(form), [(MONDAY, time(9, 30))])
+    
+        now.return_value = at(MONDAY, 9, 30)
+        self.assertFalse(self.form(date_to=MONDAY).is_valid())
+    
+    def test_caps(self, now):
+        """Long spans and schedules with too many slots are rejected."""
+        too_long = self.form(date_to=MONDAY + timedelta(days=RecurringAvailabilityForm.MAX_DAYS))
+        self.assertFalse(too_long.is_valid())
+        self.assertIn(f"at most {RecurringAvailabilityForm.MAX_DAYS} days", str(too_long.errors))
+    
+        # 91 days of 5-minute slots from 08:00 to 10:00
+        too_many = self.form(
+            date_to=MONDAY + timedelta(days=RecurringAvailabilityForm.MAX_DAYS - 1),
+            weekdays=[str(day) for day in range(7)],
+            start_time='08:00', slot_minutes=5,
+        )
+        self.assertFalse(too_many.is_valid())
+        self.assertIn(f"the limit is {RecurringAvailabilityForm.MAX_SLOTS}", str(too_many.errors))
+    
+    def test_save_counts_new_slots(self, now):
+        """Slots inserted by someone else after validation are not counted."""
+        form = self.form()
+        self.assertTrue(form.is_valid(), form.errors)
+        AvailabilitySlot.objects.create(
+            doctor=self.doctor, date=MONDAY, start_time=time(9, 0), end_time=time(9, 30)
+        )
+    
+        self.assertEqual(form.save(), 9)
+        self.assertEqual(AvailabilitySlot.objects.filter(doctor=self.doctor).count(), 10)
+
+
+class SlotIntervalIndexTests(TestCase):
+    """Overlap lookups and free gaps on sorted intervals."""
+    
+    def test_overlaps(self):
+        index = SlotIntervalIndex([(30, 40, 'b'), (10, 20, 'a')])
+    
+        self.assertTrue(index.overlaps(15, 16))
+        self.assertTrue(index.overlaps(5, 11))
+        self.assertTrue(index.overlaps(0, 100))
+        # Intervals are half-open, so touching ones do not overlap.
+        self.assertFalse(index.overlaps(20, 30))
+        self.assertFalse(index.overlaps(0, 10))
+        self.assertFalse(index.overlaps(40, 50))
+        self.assertFalse(SlotIntervalIndex().overlaps(0, 10))
+    
+    def test_overlapping(self):
+        index = SlotIntervalIndex([(10, 20, 'a'), (30, 40, 'b'), (50, 60, 'c')])
+    
+        self.assertEqual(index.overlapping(15, 35), ['a', 'b'])
+        self.assertEqual(index.overlapping(20, 30), [])
+        self.assertEqual(index.overlapping(0, 100), ['a', 'b', 'c'])
+    
+    def test_overlapping_legacy_intervals(self):
+        """A long interval that already overlaps others is still found after them."""
+        index = SlotIntervalIndex([(0, 100, 'long'), (10, 20, 'a'), (30, 40, 'b')])
+    
+        self.assertTrue(index.overlaps(50, 60))
+        self.assertEqual(index.overlapping(50, 60), ['long'])
+        self.assertEqual(index.overlapping(15, 35), ['long', 'a', 'b'])
+        self.assertFalse(index.overlaps(100, 110))
+    
+    def test_free_gaps(self):
+        index = SlotIntervalIndex([(10, 20, 'a'), (15, 25, 'b'), (40, 45, 'c')])
+    
+        self.assertEqual(index.free_gaps(0, 60), [(0, 10), (25, 40), (45, 60)])
+        self.assertEqual(index.free_gaps(12, 42), [(25, 40)])
+        self.assertEqual(index.free_gaps(0, 60, min_length=12), [(25, 40), (45, 60)])
+        self.assertEqual(index.free_gaps(10, 25), [])
+        self.assertEqual(SlotIntervalIndex().free_gaps(0, 5), [(0, 5)])
+    
+    def test_for_doctor(self):
+        """Only the doctor's slots touching the window are loaded, in one query."""
+        doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+        # Two days of 20 half-hour slots from 08:00
+        slots = make_slots([doctor], 40, MONDAY)
+    
+        tuesday = MONDAY + timedelta(days=1)
+        with self.assertNumQueries(1):
+            index = SlotIntervalIndex.for_doctor(doctor, at(tuesday, 8, 45), at(tuesday, 10))
+        self.assertEqual([slot.id for _, _, slot in index.intervals], [slot.id for slot in slots[21:24]])
+
+
+@mock.patch('django.utils.timezone.now', return_value=at(MONDAY, 8))
+class SlotOverlapFormTests(TestCase):
+    """Single and recurring slot creation reject overlapping slots."""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.doctor = CustomUser.objects.create_user(
+            username='doctor@example.com', email='doctor@example.com', role='DOCTOR'
+        )
+        AvailabilitySlot.objects.create(doctor=cls.doctor, date=MONDAY, start_time=time(9), end_time=time(10))
+        AvailabilitySlot.objects.create(doctor=cls.doctor, date=MONDAY, start_time=time(11), end_time=time(12))
+    
+    def form(self, start_time, end_time):
+        return AvailabilitySlotForm(
+            {'date': MONDAY, 'start_time': start_time, 'end_time': end_time}, doctor=self.doctor
+        )
+    
+    def test_partial_overlap_rejected(self, now):
+        self.assertFalse(self.form('09:30', '10:30').is_valid())
+    
+        form = self.form('09:30', '10:45')
+        self.assertFalse(form.is_valid())
+        message = form.non_field_errors()[0]
+        self.assertIn("overlaps your existing slots on 2030-01-07: 09:00-10:00", message)
+        # 10:00-11:00 is too short for a 75-minute slot.
+        self.assertIn("Free times that fit it: 00:00-09:00, 12:00-24:00.", message)
+    
+    def test_adjacent_slot_accepted(self, now):
+        self.assertTrue(self.form('10:00', '11:00').is_valid())
+    
+    def test_other_doctor_ignored(self, now):
+        other = CustomUser.objects.create_user(
+            username='other@example.com', email='other@example.com', role='DOCTOR'
+        )
+        form = AvailabilitySlotForm(
+            {'date': MONDAY, 'start_time': '09:30', 'end_time': '10:30'}, doctor=other
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+    
+    def test_recurring_overlap_rejected(self, now):
+        form = RecurringAvailabilityForm({
+            'date_from': MONDAY, 'date_to': MONDAY, 'weekdays': ['0'],
+            'start_time': '08:00', 'end_time': '12:00', 'slot_minutes': 45, 'exclusions': '',
+        }, doctor=self.doctor)
+    
+        self.assertFalse(form.is_valid())
+        self.assertIn(
+            "Overlaps existing slots: 2030-01-07 09:00-10:00, 2030-01-07 11:00-12:00.",
+            form.non_field_errors()[0],
+        )
@@ -1,39 +1,50 @@
 """Views for doctors app."""
+import asyncio
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_http_methods
 from django.contrib import messages
+from accounts.decorators import async_login_required
+from config.db_routers import read_from_replica
 from .models import AvailabilitySlot
-from .forms import AvailabilitySlotForm
+from .forms import AvailabilitySlotForm, RecurringAvailabilityForm
+from .summary import aget_doctor_summary, invalidate_doctor_summary
 from bookings.models import Booking
+from services.slot_events import publish_event, publish_slot_event, publish_slots_created, slot_event
 
 
 def doctor_only(view_func):
-    """Decorator to check if user is a doctor."""
-    def wrapper(request, *args, **kwargs):
+    """Decorator to check if user is a doctor.
+    
+    Async views must be wrapped in ``async_login_required`` first so that
+    ``request.user`` is already loaded.
+    """
+    def allowed(request):
         if not request.user.is_authenticated or not request.user.is_doctor():
             messages.error(request, "You don't have permission to access this page.")
+            return False
+        return True
+    
+    if asyncio.iscoroutinefunction(view_func):
+        async def async_wrapper(request, *args, **kwargs):
+            if not allowed(request):
+                return redirect('login')
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+    
+    def wrapper(request, *args, **kwargs):
+        if not allowed(request):
             return redirect('login')
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-@login_required(login_url='login')
+@read_from_replica
+@async_login_required(login_url='login')
 @doctor_only
-def doctor_dashboard(request):
+async def doctor_dashboard(request):
     """Doctor dashboard view."""
-    doctor = request.user
-    slots = AvailabilitySlot.objects.filter(doctor=doctor).order_by('-date', 'start_time')
-    bookings = Booking.objects.filter(doctor=doctor).select_related('patient').order_by('-created_at')
-    
-    context = {
-        'slots_count': slots.count(),
-        'booked_slots_count': slots.filter(is_booked=True).count(),
-        'available_slots_count': slots.filter(is_booked=False).count(),
-        'total_bookings': bookings.count(),
-        'recent_bookings': bookings[:5],
-        'slots': slots[:10],
-    }
+    context = await aget_doctor_summary(request.user)
     
     return render(request, 'doctors/dashboard.html', context)
 
@@ -44,11 +55,13 @@ def doctor_dashboard(request):
 def create_availability(request):
     """Create availability slot."""
     if request.method == 'POST':
-        form = AvailabilitySlotForm(request.POST)
+        form = AvailabilitySlotForm(request.POST, doctor=request.user)
         if form.is_valid():
             slot = form.save(commit=False)
             slot.doctor = request.user
             slot.save()
+            invalidate_doctor_summary(request.user.id)
+            publish_slot_event('created', slot)
             messages.success(request, "Availability slot created successfully.")
             return redirect('doctor_dashboard')
     else:
@@ -57,6 +70,25 @@ def create_availability(request):
     return render(request, 'doctors/create_availability.html', {'form': form})
 
 
+@login_required(login_url='login')
+@doctor_only
+@require_http_methods(["GET", "POST"])
+def create_recurring_availability(request):
+    """Create a recurring schedule of availability slots in one request."""
+    if request.method == 'POST':
+        form = RecurringAvailabilityForm(request.POST, doctor=request.user)
+        if form.is_valid():
+            created = form.save()
+            invalidate_doctor_summary(request.user.id)
+            publish_slots_created(request.user.id, created)
+            messages.success(request, f"{created} availability slots created successfully.")
+            return redirect('manage_availability')
+    else:
+        form = RecurringAvailabilityForm(doctor=request.user)
+    
+    return render(request, 'doctors/create_recurring_availability.html', {'form': form})
+
+
 @login_required(login_url='login')
 @doctor_only
 def manage_availability(request):
@@ -81,7 +113,10 @@ def delete_availability(request, slot_id):
         messages.error(request, "Cannot delete a booked slot.")
         return redirect('manage_availability')
     
+    event = slot_event('deleted', slot)
     slot.delete()
+    invalidate_doctor_summary(request.user.id)
+    publish_event(event)
     messages.success(request, "Availability slot deleted successfully.")
     return redirect('manage_availability')
 
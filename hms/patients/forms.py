@@ -0,0 +1,58 @@
+"""Forms for patients app."""
+from django import forms
+from django.core.exceptions import ValidationError
+from .slots import PAGE_SIZE, MAX_PAGE_SIZE, InvalidCursor, decode_cursor
+
+
+class SlotFilterForm(forms.Form):
+    """Filters and cursor for browsing available slots."""
+    
+    doctor = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    time_from = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time'}))
+    time_to = forms.TimeField(required=False, widget=forms.TimeInput(attrs={'type': 'time'}))
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+    limit = forms.IntegerField(required=False, min_value=1, max_value=MAX_PAGE_SIZE, widget=forms.HiddenInput)
+    
+    def clean_cursor(self):
+        """Reject cursors that were not produced by the slot list."""
+        cursor = self.cleaned_data.get('cursor')
+        if cursor:
+            try:
+                decode_cursor(cursor)
+            except InvalidCursor as e:
+                raise ValidationError(str(e))
+        return cursor
+    
+    def clean(self):
+        """Validate form data."""
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        
+        if date_from and date_to and date_from > date_to:
+            raise ValidationError("Start date must not be after end date.")
+        
+        if not cleaned_data.get('limit'):
+            cleaned_data['limit'] = PAGE_SIZE
+        
+        return cleaned_data
+    
+    def filters(self):
+        """Keyword arguments for slots.available_slots()."""
+        data = self.cleaned_data
+        return {
+            'doctor_id': data.get('doctor'),
+            'date_from': data.get('date_from'),
+            'date_to': data.get('date_to'),
+            'time_from': data.get('time_from'),
+            'time_to': data.get('time_to'),
+        }
+
+
+class EarliestSlotsForm(SlotFilterForm):
+    """Filters for the earliest-available search; no cursor paging."""
+    
+    cursor = None
+    per_doctor = forms.IntegerField(required=False, min_value=1, max_value=MAX_PAGE_SIZE)
@@ -0,0 +1,15 @@
+"""Serializers for patients app."""
+from rest_framework import serializers
+from doctors.models import AvailabilitySlot
+
+
+class AvailableSlotSerializer(serializers.ModelSerializer):
+    """Read-only representation of a bookable slot."""
+    
+    doctor_name = serializers.CharField(source='doctor.get_full_name', read_only=True)
+    
+    class Meta:
+        """Meta options for AvailableSlotSerializer."""
+        model = AvailabilitySlot
+        fields = ('id', 'doctor_id', 'doctor_name', 'date', 'start_time', 'end_time', 'starts_at', 'ends_at')
+        read_only_fields = fields
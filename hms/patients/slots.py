@@ -0,0 +1,150 @@
+"""Queries for browsing available appointment slots.
+
+Slots are paged with a keyset (seek) cursor on ``(starts_at, id)`` instead
+of OFFSET, so every page is a bounded range read on the free-slot index no
+matter how deep the patient pages. ``starts_at`` is ``date + start_time``,
+so this is the same order as ``(date, start_time, id)``.
+
+``earliest_slots`` answers "next N free slots" and "first free slot per
+doctor" without paging through the whole list.
+"""
+import base64
+import binascii
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import connections
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from doctors.models import AvailabilitySlot
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def encode_cursor(slot):
+    """Opaque cursor pointing just past ``slot``."""
+    raw = f"{slot.starts_at.isoformat()}|{slot.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(starts_at, id)`` from a cursor made by ``encode_cursor``."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        starts_at, slot_id = base64.urlsafe_b64decode(padded).decode().rsplit('|', 1)
+        starts_at = parse_datetime(starts_at)
+        slot_id = int(slot_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Invalid cursor.")
+    if starts_at is None:
+        raise InvalidCursor("Invalid cursor.")
+    return starts_at, slot_id
+
+
+def available_slots(doctor_id=None, date_from=None, date_to=None,
+                    time_from=None, time_to=None, now=None):
+    """Future unbooked slots matching the filters, in browsing order."""
+    now = now or timezone.now()
+    tz = timezone.get_default_timezone()
+    
+    slots = AvailabilitySlot.objects.filter(is_booked=False, starts_at__gt=now)
+    
+    if doctor_id:
+        slots = slots.filter(doctor_id=doctor_id)
+    if date_from:
+        slots = slots.filter(
+            starts_at__gte=timezone.make_aware(datetime.combine(date_from, time.min), tz)
+        )
+    if date_to:
+        slots = slots.filter(
+            starts_at__lt=timezone.make_aware(datetime.combine(date_to + timedelta(days=1), time.min), tz)
+        )
+    if time_from:
+        slots = slots.filter(start_time__gte=time_from)
+    if time_to:
+        slots = slots.filter(start_time__lte=time_to)
+    
+    return slots.select_related('doctor').order_by('starts_at', 'id')
+
+
+def _after_cursor(slots, cursor):
+    if not cursor:
+        return slots
+    starts_at, slot_id = decode_cursor(cursor)
+    return slots.filter(
+        Q(starts_at__gt=starts_at) | Q(starts_at=starts_at, id__gt=slot_id)
+    )
+
+
+def _split_page(page, limit):
+    next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+    return page[:limit], next_cursor
+
+
+def page_after(slots, cursor=None, limit=PAGE_SIZE):
+    """Return ``(page, next_cursor)`` for the slots following ``cursor``."""
+    slots = _after_cursor(slots, cursor)
+    
+    # Fetch one extra row to know whether another page exists.
+    page = list(slots[:limit + 1])
+    return _split_page(page, limit)
+
+
+async def apage_after(slots, cursor=None, limit=PAGE_SIZE):
+    """Async version of ``page_after`` for async views."""
+    slots = _after_cursor(slots, cursor)
+    page = [slot async for slot in slots[:limit + 1]]
+    return _split_page(page, limit)
+
+
+def earliest_slots(limit=PAGE_SIZE, per_doctor=None, **filters):
+    """The ``limit`` earliest free slots, at most ``per_doctor`` per doctor.
+    
+    Without ``per_doctor`` this is the head of the browsing order, a range
+    read on the free-slot index. ``per_doctor=1`` gives each doctor's first
+    free slot, soonest first. ``filters`` are those of ``available_slots``.
+    """
+    slots = available_slots(**filters)
+    if not per_doctor:
+        return list(slots[:limit])
+    
+    features = connections[slots.db].features
+    if per_doctor == 1 and features.can_distinct_on_fields:
+        # PostgreSQL: SELECT DISTINCT ON (doctor_id) ... ORDER BY doctor_id, starts_at
+        firsts = slots.order_by('doctor_id', 'starts_at', 'id').distinct('doctor_id').values('id')
+        return list(
+            AvailabilitySlot.objects.filter(id__in=firsts)
+            .select_related('doctor')
+            .order_by('starts_at', 'id')[:limit]
+        )
+    if features.supports_over_clause:
+        ranked = slots.annotate(doctor_rank=Window(
+            RowNumber(),
+            partition_by=F('doctor_id'),
+            order_by=(F('starts_at').asc(), F('id').asc()),
+        ))
+        return list(ranked.filter(doctor_rank__lte=per_doctor)[:limit])
+    return _earliest_by_scan(slots, limit, per_doctor)
+
+
+def _earliest_by_scan(slots, limit, per_doctor, chunk_size=500):
+    # Databases without window functions: walk the browsing order and
+    # skip doctors that already have ``per_doctor`` slots.
+    taken = Counter()
+    result = []
+    for slot in slots.iterator(chunk_size=chunk_size):
+        if taken[slot.doctor_id] >= per_doctor:
+            continue
+        taken[slot.doctor_id] += 1
+        result.append(slot)
+        if len(result) == limit:
+            break
+    return result
@@ -0,0 +1,36 @@
+"""Tests for patients app."""
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from accounts.models import CustomUser
+from services import ratelimit
+
+
+@override_settings(RATE_LIMIT_ENABLED=True, RATE_LIMIT_BACKEND='memory')
+class SlotApiRateLimitTests(TestCase):
+    """Each JSON slot API has its own bucket."""
+    
+    BURST = 30
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.patient = CustomUser.objects.create_user(
+            username='patient@example.com', email='patient@example.com', role='PATIENT'
+        )
+    
+    def setUp(self):
+        cache.clear()
+        ratelimit.reset()
+        self.addCleanup(ratelimit.reset)
+        self.client.force_login(self.patient)
+    
+    def test_separate_buckets(self):
+        """Using up one API's burst leaves the other available."""
+        slots_url = reverse('api_available_slots')
+        for _ in range(self.BURST):
+            self.assertEqual(self.client.get(slots_url).status_code, 200)
+    
+        response = self.client.get(slots_url)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertEqual(self.client.get(reverse('api_earliest_slots')).status_code, 200)
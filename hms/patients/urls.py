@@ -7,4 +7,7 @@ urlpatterns = [
     path('doctors/', views.view_doctors, name='view_doctors'),
     path('slots/', views.view_available_slots, name='view_slots'),
     path('slots/<int:doctor_id>/', views.view_available_slots, name='view_doctor_slots'),
+    path('api/slots/', views.available_slots_api, name='api_available_slots'),
+    path('api/slots/earliest/', views.earliest_slots_api, name='api_earliest_slots'),
+    path('slots/events/', views.slot_events_stream, name='slot_events'),
 ]
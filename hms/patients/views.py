@@ -1,41 +1,79 @@
 """Views for patients app."""
+import asyncio
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from doctors.models import AvailabilitySlot
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from accounts.decorators import async_login_required
 from accounts.models import CustomUser
-from bookings.models import Booking
+from bookings.forms import WaitlistForm
+from bookings.models import Booking, WaitlistEntry
+from config.db_routers import read_from_replica
+from services import slot_events
+from services.ratelimit import rate_limit
+from .forms import EarliestSlotsForm, SlotFilterForm
+from .serializers import AvailableSlotSerializer
+from .slots import available_slots, apage_after, earliest_slots, page_after
 
 
 def patient_only(view_func):
-    """Decorator to check if user is a patient."""
-    def wrapper(request, *args, **kwargs):
+    """Decorator to check if user is a patient.
+    
+    Async views must be wrapped in ``async_login_required`` first so that
+    ``request.user`` is already loaded.
+    """
+    def allowed(request):
         if not request.user.is_authenticated or not request.user.is_patient():
             messages.error(request, "You don't have permission to access this page.")
+            return False
+        return True
+    
+    if asyncio.iscoroutinefunction(view_func):
+        async def async_wrapper(request, *args, **kwargs):
+            if not allowed(request):
+                return redirect('login')
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+    
+    def wrapper(request, *args, **kwargs):
+        if not allowed(request):
             return redirect('login')
         return view_func(request, *args, **kwargs)
     return wrapper
 
 
-@login_required(login_url='login')
+@read_from_replica
+@async_login_required(login_url='login')
 @patient_only
-def patient_dashboard(request):
+async def patient_dashboard(request):
     """Patient dashboard view."""
     patient = request.user
     
     # Get patient's booking
-    booking = Booking.objects.filter(patient=patient).select_related(
+    booking = await Booking.objects.filter(patient=patient).select_related(
         'doctor', 'slot'
-    ).first()
+    ).afirst()
+    
+    waitlist = [
+        entry async for entry in WaitlistEntry.objects.filter(patient=patient)
+        .select_related('doctor').order_by('date', 'created_at')
+    ]
     
     context = {
         'has_booking': booking is not None,
         'booking': booking,
+        'waitlist': waitlist,
     }
     
     return render(request, 'patients/dashboard.html', context)
 
 
+@read_from_replica
 @login_required(login_url='login')
 @patient_only
 def view_doctors(request):
@@ -49,24 +87,131 @@ def view_doctors(request):
     return render(request, 'patients/view_doctors.html', context)
 
 
-@login_required(login_url='login')
+@read_from_replica
+@async_login_required(login_url='login')
 @patient_only
-def view_available_slots(request, doctor_id=None):
-    """View available slots."""
-    from django.utils import timezone
-    from datetime import datetime
+async def view_available_slots(request, doctor_id=None):
+    """View available slots, one keyset page at a time."""
+    params = request.GET.copy()
+    if doctor_id:
+        params['doctor'] = doctor_id
     
-    # Get future available slots
-    slots = AvailabilitySlot.objects.filter(
-        is_booked=False,
-        date__gte=timezone.now().date()
-    ).select_related('doctor').order_by('date', 'start_time')
+    form = SlotFilterForm(params)
+    slots, next_cursor = [], None
+    if form.is_valid():
+        slots, next_cursor = await apage_after(
+            available_slots(**form.filters()),
+            cursor=form.cleaned_data['cursor'],
+            limit=form.cleaned_data['limit'],
+        )
     
-    if doctor_id:
-        slots = slots.filter(doctor_id=doctor_id)
+    next_query = None
+    if next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = next_cursor
+        next_query = query.urlencode()
     
     context = {
+        'form': form,
         'slots': slots,
+        'next_query': next_query,
+        'is_first_page': not request.GET.get('cursor'),
+        # Offered on a doctor's own slot list when the wanted day is full
+        'waitlist_form': WaitlistForm(initial={
+            'doctor': doctor_id,
+            'date': request.GET.get('date_from'),
+        }) if doctor_id else None,
     }
     
     return render(request, 'patients/view_slots.html', context)
+
+
+@read_from_replica
+@rate_limit('120/m', burst=30, methods=('GET',), scope='api_available_slots')
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def available_slots_api(request):
+    """JSON variant of view_available_slots."""
+    if not request.user.is_patient():
+        return Response(
+            {'error': "You don't have permission to access this page."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    form = SlotFilterForm(request.query_params)
+    if not form.is_valid():
+        return Response({'errors': form.errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    slots, next_cursor = page_after(
+        available_slots(**form.filters()),
+        cursor=form.cleaned_data['cursor'],
+        limit=form.cleaned_data['limit'],
+    )
+    
+    next_url = None
+    if next_cursor:
+        query = request.query_params.copy()
+        query['cursor'] = next_cursor
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    
+    return Response({
+        'results': AvailableSlotSerializer(slots, many=True).data,
+        'next_cursor': next_cursor,
+        'next': next_url,
+    })
+
+
+@read_from_replica
+@rate_limit('120/m', burst=30, methods=('GET',), scope='api_earliest_slots')
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def earliest_slots_api(request):
+    """Earliest free slots across all doctors.
+    
+    ``?limit=10`` gives the next ten free slots anywhere; adding
+    ``per_doctor=1`` gives the first free slot of each doctor instead.
+    Accepts the same date and time filters as available_slots_api.
+    """
+    if not request.user.is_patient():
+        return Response(
+            {'error': "You don't have permission to access this page."},
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    form = EarliestSlotsForm(request.query_params)
+    if not form.is_valid():
+        return Response({'errors': form.errors}, status=status.HTTP_400_BAD_REQUEST)
+    
+    slots = earliest_slots(
+        limit=form.cleaned_data['limit'],
+        per_doctor=form.cleaned_data['per_doctor'],
+        **form.filters()
+    )
+    
+    return Response({
+        'results': AvailableSlotSerializer(slots, many=True).data,
+    })
+
+
+@async_login_required(login_url='login')
+@patient_only
+async def slot_events_stream(request):
+    """Server-sent events announcing booked, freed, created and deleted slots.
+    
+    ``?doctor=<id>`` limits the stream to one doctor. Served from the event
+    loop under ASGI; under WSGI each open stream holds a worker thread.
+    """
+    try:
+        doctor_id = int(request.GET['doctor'])
+    except (KeyError, ValueError):
+        doctor_id = None
+    
+    if isinstance(request, ASGIRequest):
+        events = slot_events.astream(doctor_id)
+    else:
+        events = slot_events.stream(doctor_id)
+    
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,64 +1,140 @@
 import requests
 import logging
+import threading
 from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from .metrics import track_call
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
 
-def send_signup_welcome(user):
-    payload = {
-        'action': 'SIGNUP_WELCOME',
-        'recipient_email': user.email,
-        'recipient_name': user.get_full_name(),
-        'role': user.get_role_display(),
-    }
+# Longest Retry-After the client will wait for; longer ones fail the call.
+RETRY_AFTER_MAX = 10
 
-    try:
-        requests.post(
-            f"{settings.EMAIL_SERVICE_URL}/send-email",
-            json=payload,
-            timeout=5
-        )
-    except Exception as e:
-        logger.error(f"Welcome email failed: {e}")
 
+class RetryAfterOnly(Retry):
+    """Retry a status only when the server says when to come back.
 
-def send_booking_confirmation(booking):
-    try:
-        # Patient
-        requests.post(
-            f"{settings.EMAIL_SERVICE_URL}/send-email",
-            json={
-                'action': 'BOOKING_CONFIRMATION',
-                'recipient_email': booking.patient.email,
-                'recipient_name': booking.patient.get_full_name(),
-                'doctor_name': booking.doctor.get_full_name(),
-                'date': str(booking.slot.date),
-                'time': str(booking.slot.start_time),
-            },
-            timeout=5
-        )
+    Sends are POSTs and not idempotent: a 5xx or a read timeout may come
+    after the email went out, so only refusals carrying ``Retry-After``
+    (429 and 503) and connection errors are retried.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        return has_retry_after and super().is_retry(method, status_code, has_retry_after)
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None:
+            seconds = self.get_retry_after(response)
+            if seconds is not None and seconds > RETRY_AFTER_MAX:
+                raise MaxRetryError(_pool, url, ResponseError(f"Retry-After of {seconds:g}s is too long"))
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+
+def get_session():
+    """Return the shared keep-alive session used for all email service calls.
+
+    Connections are pooled per host. Connection errors are retried with
+    exponential backoff, and 429/503 responses after their ``Retry-After``;
+    read errors are never retried, so a slow service does not get the same
+    email twice.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                retry = RetryAfterOnly(
+                    total=settings.EMAIL_SERVICE_MAX_RETRIES,
+                    read=0,
+                    other=0,
+                    backoff_factor=settings.EMAIL_SERVICE_BACKOFF_FACTOR,
+                    status_forcelist=(429, 503),
+                    allowed_methods=frozenset(['POST']),
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=settings.EMAIL_SERVICE_POOL_SIZE,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+def reset_session():
+    """Close the shared session, e.g. after settings change or a fork."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def send_payloads(payloads):
+    """Send many prepared payloads through the ``/send-emails`` batch endpoint.
 
+    Payloads are split into chunks of ``EMAIL_SERVICE_BATCH_SIZE``. Returns a
+    list of booleans aligned with ``payloads``; a chunk whose request fails
+    marks all of its items as failed.
+    """
+    payloads = list(payloads)
+    results = []
+    batch_size = max(1, settings.EMAIL_SERVICE_BATCH_SIZE)
+
+    for start in range(0, len(payloads), batch_size):
+        chunk = payloads[start:start + batch_size]
+        try:
+            with track_call('email'):
+                response = get_session().post(
+                    f"{settings.EMAIL_SERVICE_URL}/send-emails",
+                    json={'messages': chunk},
+                    timeout=settings.EMAIL_SERVICE_TIMEOUT
+                )
+            response.raise_for_status()
+            items = response.json().get('results', [])
+            statuses = [item.get('status') == 200 for item in items]
+            # Anything the service did not report on counts as failed.
+            statuses += [False] * (len(chunk) - len(statuses))
+            results.extend(statuses[:len(chunk)])
+        except Exception as e:
+            logger.error(f"Batch email failed: {e}")
+            results.extend([False] * len(chunk))
+
+    return results
+
+
+def booking_confirmation_payloads(booking):
+    return [
+        # Patient
+        {
+            'action': 'BOOKING_CONFIRMATION',
+            'recipient_email': booking.patient.email,
+            'recipient_name': booking.patient.get_full_name(),
+            'doctor_name': booking.doctor.get_full_name(),
+            'date': str(booking.slot.date),
+            'time': str(booking.slot.start_time),
+        },
         # Doctor (optional)
-        requests.post(
-            f"{settings.EMAIL_SERVICE_URL}/send-email",
-            json={
-                'action': 'BOOKING_CONFIRMATION_DOCTOR',
-                'recipient_email': booking.doctor.email,
-                'recipient_name': booking.doctor.get_full_name(),
-                'patient_name': booking.patient.get_full_name(),
-                'date': str(booking.slot.date),
-                'time': str(booking.slot.start_time),
-            },
-            timeout=5
-        )
-
-    except Exception as e:
-        logger.error(f"Booking email failed: {e}")
-
-
-def send_booking_cancelled(booking):
-    payload = {
+        {
+            'action': 'BOOKING_CONFIRMATION_DOCTOR',
+            'recipient_email': booking.doctor.email,
+            'recipient_name': booking.doctor.get_full_name(),
+            'patient_name': booking.patient.get_full_name(),
+            'date': str(booking.slot.date),
+            'time': str(booking.slot.start_time),
+        },
+    ]
+
+
+def booking_cancelled_payload(booking):
+    return {
         'action': 'BOOKING_CANCELLED',
         'recipient_email': booking.patient.email,
         'recipient_name': booking.patient.get_full_name(),
@@ -67,18 +143,9 @@ def send_booking_cancelled(booking):
         'time': str(booking.slot.start_time),
     }
 
-    try:
-        requests.post(
-            f"{settings.EMAIL_SERVICE_URL}/send-email",
-            json=payload,
-            timeout=5
-        )
-    except Exception as e:
-        logger.error(f"Cancellation email failed: {e}")
 
-
-def send_appointment_reminder(booking, hours_before=1):
-    payload = {
+def appointment_reminder_payload(booking, hours_before=1):
+    return {
         'action': 'APPOINTMENT_REMINDER',
         'recipient_email': booking.patient.email,
         'recipient_name': booking.patient.get_full_name(),
@@ -88,13 +155,11 @@ def send_appointment_reminder(booking, hours_before=1):
         'hours_before': hours_before,
     }
 
-    try:
-        requests.post(
-            f"{settings.EMAIL_SERVICE_URL}/send-email",
-            json=payload,
-            timeout=5
-        )
-        return True
-    except Exception as e:
-        logger.error(f"Reminder email failed: {e}")
-        return False
+
+def signup_welcome_payload(user):
+    return {
+        'action': 'SIGNUP_WELCOME',
+        'recipient_email': user.email,
+        'recipient_name': user.get_full_name(),
+        'role': user.get_role_display(),
+    }
@@ -0,0 +1,100 @@
+"""In-process stand-in for the Google Calendar HTTP API.
+
+Set ``GOOGLE_CALENDAR_HTTP_FACTORY = 'services.fake_calendar.FakeCalendarHttp'``
+to run calendar sync locally without credentials or network access. The
+transport answers single and batch event insert/delete calls the same way
+Google does and remembers the events it holds, so delivery code can be
+exercised end to end.
+"""
+import itertools
+import json
+import threading
+from email.parser import Parser
+
+import httplib2
+
+BOUNDARY = 'fake_calendar_batch'
+
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+# event id -> event body, shared by every transport in the process
+events = {}
+# (method, path) of every call seen, batched calls included
+calls = []
+
+
+def reset():
+    """Forget stored events and recorded calls."""
+    with _lock:
+        events.clear()
+        calls.clear()
+
+
+class FakeCalendarHttp:
+    """Minimal ``httplib2.Http`` replacement understood by googleapiclient."""
+
+    def __init__(self, *args, **kwargs):
+        self.timeout = None
+
+    def request(self, uri, method='GET', body=None, headers=None, redirections=5, connection_type=None):
+        headers = {key.lower(): value for key, value in (headers or {}).items()}
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+
+        if '/batch/' in uri:
+            return self._batch(body, headers['content-type'])
+
+        status, content = self._call(method, uri, body)
+        return self._response(status), content.encode('utf-8')
+
+    def close(self):
+        pass
+
+    def _call(self, method, path, body):
+        """Apply one API call; returns ``(status, json_text)``."""
+        path = path.split('?', 1)[0]
+        with _lock:
+            calls.append((method, path))
+
+            if method == 'POST' and path.endswith('/events'):
+                event = json.loads(body or '{}')
+                event['id'] = f"fake{next(_ids)}"
+                events[event['id']] = event
+                return 200, json.dumps(event)
+
+            if method == 'DELETE' and '/events/' in path:
+                event_id = path.rsplit('/', 1)[1]
+                if events.pop(event_id, None) is None:
+                    return 404, json.dumps({'error': {'code': 404, 'message': 'Not Found'}})
+                return 204, ''
+
+        return 400, json.dumps({'error': {'code': 400, 'message': f'Unsupported call {method} {path}'}})
+
+    def _batch(self, body, content_type):
+        message = Parser().parsestr(f"Content-Type: {content_type}\r\n\r\n{body}")
+        parts = []
+
+        for part in message.get_payload():
+            request_line, rest = part.get_payload().split('\n', 1)
+            method, path, _ = request_line.strip().split(' ', 2)
+            call_body = rest.split('\r\n\r\n', 1)[1] if '\r\n\r\n' in rest else ''
+            status, content = self._call(method, path, call_body)
+
+            content_id = part['Content-ID'][1:-1]
+            parts.append(
+                f"--{BOUNDARY}\r\n"
+                "Content-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n"
+                f"HTTP/1.1 {status} {'OK' if status < 300 else 'Error'}\r\n"
+                "Content-Type: application/json; charset=UTF-8\r\n\r\n"
+                f"{content}\r\n"
+            )
+
+        content = ''.join(parts) + f"--{BOUNDARY}--\r\n"
+        response = self._response(200, f'multipart/mixed; boundary={BOUNDARY}')
+        return response, content.encode('utf-8')
+
+    @staticmethod
+    def _response(status, content_type='application/json; charset=UTF-8'):
+        return httplib2.Response({'status': status, 'content-type': content_type})
@@ -1,14 +1,21 @@
 """Google Calendar integration service."""
 import logging
 import os
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
+from django.utils.module_loading import import_string
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from google.auth.transport.requests import Request
 
+from accounts.backends import invalidate_cached_user
+from .metrics import track_call
+
 logger = logging.getLogger(__name__)
 
 SCOPES = ['https://www.googleapis.com/auth/calendar']
@@ -17,6 +24,126 @@ CLIENT_SECRETS_FILE = os.path.join(
     settings.BASE_DIR, 'credentials.json'
 )
 
+# Built Calendar services are cached per user until shortly before their
+# access token expires. httplib2 connections are not thread-safe, so each
+# thread keeps its own LRU.
+SERVICE_CACHE_SIZE = 128
+SERVICE_CACHE_DEFAULT_TTL = timedelta(minutes=50)
+EXPIRY_MARGIN = timedelta(minutes=1)
+
+# Google recommends keeping batch requests to 50 calls.
+BATCH_LIMIT = 50
+
+_local = threading.local()
+
+
+def credentials_to_token(credentials):
+    """Serialize credentials into the dict stored on the user."""
+    return {
+        'token': credentials.token,
+        'refresh_token': credentials.refresh_token,
+        'token_uri': credentials.token_uri,
+        'client_id': credentials.client_id,
+        'client_secret': credentials.client_secret,
+        'scopes': credentials.scopes,
+        'expiry': credentials.expiry.isoformat() if credentials.expiry else None,
+    }
+
+
+def credentials_from_token(token):
+    """Rebuild credentials from the dict stored on the user."""
+    expiry = token.get('expiry')
+    return Credentials(
+        token=token['token'],
+        refresh_token=token.get('refresh_token'),
+        token_uri=token['token_uri'],
+        client_id=token['client_id'],
+        client_secret=token['client_secret'],
+        scopes=token['scopes'],
+        # google-auth compares expiry against naive UTC datetimes
+        expiry=datetime.fromisoformat(expiry) if expiry else None,
+    )
+
+
+def save_refreshed_token(user, credentials):
+    """Persist the access token if google-auth refreshed it."""
+    stored = user.google_calendar_token or {}
+    if credentials.token == stored.get('token'):
+        return
+
+    user.google_calendar_token = credentials_to_token(credentials)
+    # Update only this column so a stale user instance can't clobber others.
+    type(user).objects.filter(pk=user.pk).update(
+        google_calendar_token=user.google_calendar_token
+    )
+    invalidate_cached_user(user.pk)
+    logger.info(f"Refreshed Google token saved for {user.email}")
+
+
+def _service_cache():
+    cache = getattr(_local, 'services', None)
+    if cache is None:
+        cache = _local.services = OrderedDict()
+    return cache
+
+
+def get_calendar_service(user):
+    """Return ``(service, credentials)`` for ``user``, reusing a cached build.
+
+    Entries live until ``EXPIRY_MARGIN`` before the access token expires
+    and are rebuilt if the user reconnected with a different refresh token.
+    The discovery document is loaded from the copy bundled with
+    google-api-python-client instead of being fetched.
+    """
+    token = user.google_calendar_token
+    fingerprint = (token.get('refresh_token'), token.get('client_id'))
+    cache = _service_cache()
+    now = datetime.utcnow()
+
+    cached = cache.get(user.id)
+    if cached is not None:
+        service, credentials, cached_fingerprint, valid_until = cached
+        if cached_fingerprint == fingerprint and now < valid_until:
+            cache.move_to_end(user.id)
+            return service, credentials
+        del cache[user.id]
+
+    credentials = credentials_from_token(token)
+    http_factory = getattr(settings, 'GOOGLE_CALENDAR_HTTP_FACTORY', None)
+
+    if http_factory:
+        # Local transport (see services.fake_calendar): no auth, no network.
+        service = build(
+            'calendar', 'v3',
+            http=import_string(http_factory)(),
+            static_discovery=True,
+            cache_discovery=False,
+        )
+    else:
+        if credentials.refresh_token and (credentials.expired or not credentials.expiry):
+            with track_call('google_oauth'):
+                credentials.refresh(Request())
+            save_refreshed_token(user, credentials)
+
+        service = build(
+            'calendar', 'v3',
+            credentials=credentials,
+            static_discovery=True,
+            cache_discovery=False,
+        )
+
+    if credentials.expiry:
+        valid_until = credentials.expiry - EXPIRY_MARGIN
+    else:
+        valid_until = now + SERVICE_CACHE_DEFAULT_TTL
+
+    cache[user.id] = (service, credentials, fingerprint, valid_until)
+    if len(cache) > SERVICE_CACHE_SIZE:
+        cache.popitem(last=False)
+
+    return service, credentials
+
+
 def get_google_auth_url(user_id, state=None):
     print(">>> GOOGLE_REDIRECT_URI FROM SETTINGS:", settings.GOOGLE_REDIRECT_URI)
 
@@ -47,14 +174,7 @@ def handle_oauth_callback(code, user):
         flow.fetch_token(code=code)
         credentials = flow.credentials
 
-        user.google_calendar_token = {
-            'token': credentials.token,
-            'refresh_token': credentials.refresh_token,
-            'token_uri': credentials.token_uri,
-            'client_id': credentials.client_id,
-            'client_secret': credentials.client_secret,
-            'scopes': credentials.scopes,
-        }
+        user.google_calendar_token = credentials_to_token(credentials)
         user.save()
 
         logger.info(f"Google Calendar connected for {user.email}")
@@ -65,63 +185,78 @@ def handle_oauth_callback(code, user):
         return False
 
 
-def create_calendar_event(user, booking):
-    try:
-        if not user.google_calendar_token:
-            logger.warning(f"No Google token for {user.email}")
-            return False
-
-        token = user.google_calendar_token
-        credentials = Credentials(
-            token=token['token'],
-            refresh_token=token.get('refresh_token'),
-            token_uri=token['token_uri'],
-            client_id=token['client_id'],
-            client_secret=token['client_secret'],
-            scopes=token['scopes']
-        )
+def event_body(user, booking):
+    """Calendar event resource for ``booking`` as seen by ``user``."""
+    slot = booking.slot
+    start = datetime.combine(slot.date, slot.start_time)
+    end = datetime.combine(slot.date, slot.end_time)
 
-        if credentials.expired and credentials.refresh_token:
-            credentials.refresh(Request())
-
-        service = build('calendar', 'v3', credentials=credentials)
-
-        slot = booking.slot
-        start = datetime.combine(slot.date, slot.start_time)
-        end = datetime.combine(slot.date, slot.end_time)
-
-        event = {
-            'summary': 'Medical Appointment',
-            'description': (
-                f"Booking with {booking.doctor.get_full_name()}"
-                if user.is_patient()
-                else f"Appointment with {booking.patient.get_full_name()}"
-            ),
-            'start': {
-                'dateTime': start.isoformat(),
-                'timeZone': settings.TIME_ZONE,
-            },
-            'end': {
-                'dateTime': end.isoformat(),
-                'timeZone': settings.TIME_ZONE,
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 1440},
-                    {'method': 'popup', 'minutes': 30},
-                ]
-            }
+    return {
+        'summary': 'Medical Appointment',
+        'description': (
+            f"Booking with {booking.doctor.get_full_name()}"
+            if user.is_patient()
+            else f"Appointment with {booking.patient.get_full_name()}"
+        ),
+        'start': {
+            'dateTime': start.isoformat(),
+            'timeZone': settings.TIME_ZONE,
+        },
+        'end': {
+            'dateTime': end.isoformat(),
+            'timeZone': settings.TIME_ZONE,
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 1440},
+                {'method': 'popup', 'minutes': 30},
+            ]
         }
+    }
 
-        created_event = service.events().insert(
-            calendarId='primary',
-            body=event
-        ).execute()
 
-        logger.info(f"Calendar event created: {created_event['id']}")
-        return True
+def sync_calendar_events(user, inserts=(), deletes=()):
+    """Insert and delete events in ``user``'s primary calendar in batches.
 
-    except Exception:
-        logger.exception("Failed to create calendar event")
-        return False
+    ``inserts`` is a list of ``(key, event_body)`` and ``deletes`` a list of
+    ``(key, event_id)``; keys must be unique strings. Calls are sent through
+    ``new_batch_http_request`` in groups of ``BATCH_LIMIT``, so one HTTP round
+    trip covers many bookings. Returns ``{key: result}`` where the result is
+    the new event id for inserts, True for deletes and None for failures.
+    Deleting an event that is already gone counts as success.
+    """
+    service, credentials = get_calendar_service(user)
+    results = {}
+    insert_keys = {key for key, _ in inserts}
+
+    def callback(key, response, exception):
+        if exception is None:
+            results[key] = response['id'] if key in insert_keys else True
+        elif (
+            key not in insert_keys
+            and isinstance(exception, HttpError)
+            and exception.resp.status in (404, 410)
+        ):
+            results[key] = True
+        else:
+            logger.warning(f"Calendar call {key} for {user.email} failed: {exception}")
+            results[key] = None
+
+    calls = [
+        (key, service.events().insert(calendarId='primary', body=body))
+        for key, body in inserts
+    ] + [
+        (key, service.events().delete(calendarId='primary', eventId=event_id))
+        for key, event_id in deletes
+    ]
+
+    for start in range(0, len(calls), BATCH_LIMIT):
+        batch = service.new_batch_http_request(callback=callback)
+        for key, request in calls[start:start + BATCH_LIMIT]:
+            batch.add(request, request_id=key)
+        with track_call('google_calendar'):
+            batch.execute()
+
+    save_refreshed_token(user, credentials)
+    return results
@@ -0,0 +1,189 @@
+"""In-process metrics for requests, SQL queries and outbound service calls.
+
+``RequestMetricsMiddleware`` (config/middleware.py) opens a ``RequestStats``
+for each request in a context variable. Every database connection carries
+``query_wrapper``, which adds each query to the open stats, and service
+clients wrap their HTTP calls in ``track_call``. Because the stats live in
+a context variable, queries that async views run through ``sync_to_async``
+are attributed to the right request as well.
+
+Totals are kept per process in ``registry`` and rendered in Prometheus text
+format by the ``/metrics`` view. With several worker processes each one
+reports its own counters, so scrape every worker or sum them downstream.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METRICS = {
+    'hms_http_requests_total': ('counter', 'HTTP requests by view, method and status.'),
+    'hms_http_request_duration_seconds': ('histogram', 'Request latency by view.'),
+    'hms_db_queries_per_request': ('histogram', 'SQL queries issued per request by view.'),
+    'hms_db_queries_total': ('counter', 'SQL queries issued by view.'),
+    'hms_db_query_seconds_total': ('counter', 'Time spent in SQL queries by view.'),
+    'hms_outbound_calls_total': ('counter', 'Outbound service calls by service.'),
+    'hms_outbound_call_seconds_total': ('counter', 'Time spent in outbound service calls by service.'),
+}
+
+_current = ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    """Queries and outbound calls made while handling one request."""
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.calls = defaultdict(lambda: [0, 0.0])
+
+    def add_call(self, service, seconds):
+        self.calls[service][0] += 1
+        self.calls[service][1] += seconds
+
+
+class Registry:
+    """Thread-safe counters and histograms keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] += value
+
+    def observe(self, name, labels, value, buckets):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [buckets, [0] * len(buckets), 0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[1][i] += 1
+            histogram[2] += value
+            histogram[3] += 1
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            counters = dict(self.counters)
+            histograms = {key: (b, list(c), s, n) for key, (b, c, s, n) in self.histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == 'counter':
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            else:
+                for (metric, labels), (buckets, counts, total, count) in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    for bound, bucket_count in zip(buckets, counts):
+                        lines.append(f"{name}_bucket{_labels(labels + (('le', _number(bound)),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+                    lines.append(f"{name}_count{_labels(labels)} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+registry = Registry()
+
+
+def begin_request():
+    """Open stats for the current request; returns a token for ``end_request``."""
+    return _current.set(RequestStats())
+
+
+def end_request(token):
+    """Close the stats opened by ``begin_request`` and return them."""
+    stats = _current.get()
+    _current.reset(token)
+    return stats
+
+
+def record_request(view, method, status, seconds, stats):
+    """Add a finished request to the process-wide registry."""
+    labels = {'view': view}
+    registry.inc('hms_http_requests_total', {'view': view, 'method': method, 'status': str(status)})
+    registry.observe('hms_http_request_duration_seconds', labels, seconds, LATENCY_BUCKETS)
+    registry.observe('hms_db_queries_per_request', labels, stats.queries, QUERY_COUNT_BUCKETS)
+    registry.inc('hms_db_queries_total', labels, stats.queries)
+    registry.inc('hms_db_query_seconds_total', labels, stats.query_seconds)
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook counting queries for the open request."""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.query_seconds += time.perf_counter() - started
+
+
+def _add_query_wrapper(connection):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+def install_query_wrapper():
+    """Attach ``query_wrapper`` to every database connection, present and future."""
+    connection_created.connect(
+        lambda sender, connection, **kwargs: _add_query_wrapper(connection),
+        weak=False,
+        dispatch_uid='services.metrics.query_wrapper',
+    )
+    for connection in connections.all(initialized_only=True):
+        _add_query_wrapper(connection)
+
+
+@contextmanager
+def track_call(service):
+    """Time an outbound call to ``service`` (e.g. ``'email'``)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        registry.inc('hms_outbound_calls_total', {'service': service})
+        registry.inc('hms_outbound_call_seconds_total', {'service': service}, seconds)
+        stats = _current.get()
+        if stats is not None:
+            stats.add_call(service, seconds)
@@ -0,0 +1,218 @@
+"""Token-bucket rate limiting for views.
+
+Each client gets a bucket per rule holding up to ``burst`` tokens that
+refills at ``rate`` tokens per second; a request takes one token, and a
+request that finds the bucket empty gets ``429 Too Many Requests`` with a
+``Retry-After`` header.
+
+Rules are attached in two ways:
+
+- ``RateLimitMiddleware`` (config/middleware.py) applies ``RATE_LIMITS``,
+  keyed by URL name, so booking and auth views are limited without
+  touching them;
+- the ``rate_limit`` decorator limits a single view.
+
+By default (``RATE_LIMIT_BACKEND = 'memory'``) buckets are kept in this
+process, which costs a few microseconds per request but gives every worker
+process its own limits. With ``'cache'`` they live in the Django cache
+(``RATE_LIMIT_CACHE``), so every process sharing the cache shares the
+limits, at the cost of two cache round trips per limited request; the
+read-modify-write is not atomic, so a burst racing across processes may get
+a few extra requests through. If the cache is unavailable, buckets fall
+back to process memory.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.cache import caches
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# rate: tokens per second; burst: bucket size; key: 'user' or 'ip'
+Rule = namedtuple('Rule', 'scope rate burst key methods')
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+MEMORY_MAX_KEYS = 10000
+
+
+def parse_rate(rate):
+    """``'10/m'`` -> ``(10 / 60, 10)``: tokens per second and default burst."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count / PERIODS[period[0]], count
+
+
+def make_rule(scope, rate, burst=None, key='user', methods=('POST',)):
+    per_second, default_burst = parse_rate(rate)
+    return Rule(scope, per_second, burst or default_burst, key, frozenset(methods))
+
+
+class MemoryBuckets:
+    """Buckets in a bounded dict; least recently used keys are dropped."""
+
+    def __init__(self, max_keys=MEMORY_MAX_KEYS):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def take(self, key, rate, burst, now):
+        with self._lock:
+            state = self._buckets.pop(key, None)
+            tokens, updated = state if state else (burst, now)
+            tokens, retry_after = _take(tokens, updated, rate, burst, now)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class CacheBuckets:
+    """Buckets in the Django cache, expiring once they would be full again."""
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def take(self, key, rate, burst, now):
+        cache = caches[self.alias]
+        tokens, updated = cache.get(key) or (burst, now)
+        tokens, retry_after = _take(tokens, updated, rate, burst, now)
+        cache.set(key, (tokens, now), math.ceil(burst / rate) + 1)
+        return retry_after
+
+
+def _take(tokens, updated, rate, burst, now):
+    """Refill, then take one token; returns ``(tokens, retry_after or None)``."""
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, None
+    return tokens, (1 - tokens) / rate
+
+
+memory_buckets = MemoryBuckets()
+
+
+def take(bucket_key, rule, now=None):
+    """Take a token for ``bucket_key``; returns None or seconds to wait."""
+    now = time.time() if now is None else now
+    if settings.RATE_LIMIT_BACKEND == 'cache':
+        try:
+            return CacheBuckets(settings.RATE_LIMIT_CACHE).take(bucket_key, rule.rate, rule.burst, now)
+        except Exception as e:
+            logger.warning(f"Rate limit cache unavailable, using process memory: {e}")
+    return memory_buckets.take(bucket_key, rule.rate, rule.burst, now)
+
+
+def client_ip(request):
+    value = request.META.get(settings.RATE_LIMIT_IP_META, '') or request.META.get('REMOTE_ADDR', '')
+    # X-Forwarded-For: client, proxy1, proxy2
+    return value.split(',')[0].strip()
+
+
+def client_key(request, rule):
+    """Bucket key for the client: the session's user id, else the IP.
+
+    The user id is read from the session rather than ``request.user`` so
+    that no user query runs before the view.
+    """
+    if rule.key == 'user':
+        user_id = request.session.get(SESSION_KEY) if hasattr(request, 'session') else None
+        if user_id is not None:
+            return f'ratelimit:{rule.scope}:user:{user_id}'
+    return f'ratelimit:{rule.scope}:ip:{client_ip(request)}'
+
+
+def applies(request, rule):
+    return settings.RATE_LIMIT_ENABLED and request.method in rule.methods
+
+
+def check(request, rule):
+    """The 429 response if ``request`` is over ``rule``'s limit, else None."""
+    if not applies(request, rule):
+        return None
+    retry_after = take(client_key(request, rule), rule)
+    if retry_after is None:
+        return None
+    seconds = max(1, math.ceil(retry_after))
+    response = HttpResponse(
+        f"Too many requests. Try again in {seconds} seconds.\n",
+        status=429,
+        content_type='text/plain; charset=utf-8',
+    )
+    response['Retry-After'] = str(seconds)
+    return response
+
+
+_rules = None
+
+
+def rules():
+    """``RATE_LIMITS`` as ``{url_name: Rule}``, parsed once."""
+    global _rules
+    if _rules is None:
+        _rules = {
+            name: make_rule(name, **options)
+            for name, options in settings.RATE_LIMITS.items()
+        }
+    return _rules
+
+
+def reset():
+    """Forget parsed rules and in-memory buckets (after settings change)."""
+    global _rules
+    _rules = None
+    memory_buckets.clear()
+
+
+def view_scope(view_func):
+    """Default bucket scope for a view: its dotted name.
+
+    Class-based views (including DRF ``api_view`` functions) are named by
+    their class, since the ``as_view()`` function has the same qualified
+    name for every view.
+    """
+    view = getattr(view_func, 'view_class', None) or getattr(view_func, 'cls', None) or view_func
+    return f'{view.__module__}.{view.__name__}'
+
+
+def rate_limit(rate, burst=None, key='user', methods=('POST',), scope=None):
+    """Limit a view to ``rate`` (e.g. ``'10/m'``) requests per client.
+
+    Works on sync and async views; the bucket is shared by every URL
+    routed to the view, and by any other view given the same ``scope``
+    (default: ``view_scope(view_func)``).
+    """
+    def decorator(view_func):
+        rule = make_rule(scope or view_scope(view_func), rate, burst, key, methods)
+
+        if asyncio.iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if applies(request, rule):
+                    # The session (and possibly the cache) may hit the database.
+                    response = await sync_to_async(check)(request, rule)
+                    if response is not None:
+                        return response
+                return await view_func(request, *args, **kwargs)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = check(request, rule)
+            if response is not None:
+                return response
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
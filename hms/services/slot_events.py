@@ -0,0 +1,288 @@
+"""Slot availability events pushed to browsers with server-sent events.
+
+Booking, cancelling and creating or deleting slots call
+``publish_slot_event`` inside their transaction; the event reaches the
+broker once the transaction commits, so rolled-back changes are never
+announced. The ``slot_events`` view subscribes each connected browser and
+streams what the broker fans out.
+
+The broker is chosen with ``SLOT_EVENTS_BROKER``:
+
+``services.slot_events.LocalBroker``
+    Fans events out to the subscribers of this process only. Enough for a
+    single uvicorn or runserver process.
+``services.slot_events.CacheBroker``
+    Also appends every event to a short-lived log in the Django cache.
+    Each process polls the log every ``SLOT_EVENTS_POLL_INTERVAL`` seconds
+    and fans new events out to its own subscribers. This stands in for
+    Redis pub/sub and works with any cache shared between processes.
+    Sequence numbers come from ``cache.incr``, which is atomic on
+    memcached and redis but not on the file-based cache.
+"""
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 100
+RETRY_MS = 3000
+
+
+class Subscription:
+    """Bounded event queue for one connected browser.
+
+    A browser that falls ``QUEUE_SIZE`` events behind is marked as
+    overflowed; its stream then asks it to reload instead of blocking the
+    publisher.
+    """
+
+    def __init__(self, broker, doctor_id=None):
+        self.broker = broker
+        self.doctor_id = doctor_id
+        self.overflowed = False
+
+    def wants(self, event):
+        return self.doctor_id is None or event['doctor_id'] == self.doctor_id
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class SyncSubscription(Subscription):
+    """Subscription read from a worker thread (WSGI)."""
+
+    def __init__(self, broker, doctor_id=None):
+        super().__init__(broker, doctor_id)
+        self.queue = queue.Queue(QUEUE_SIZE)
+
+    def put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds."""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class AsyncSubscription(Subscription):
+    """Subscription read from the event loop (ASGI)."""
+
+    def __init__(self, broker, doctor_id=None):
+        super().__init__(broker, doctor_id)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+
+    def put(self, event):
+        # Publishers run in worker threads; hand the event to the loop.
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Loop already closed; the stream is gone.
+            self.close()
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout):
+        """Next event, or None after ``timeout`` seconds."""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """In-process pub/sub: every event goes to every matching subscriber."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self, doctor_id=None, asynchronous=True):
+        subscription_class = AsyncSubscription if asynchronous else SyncSubscription
+        subscription = subscription_class(self, doctor_id)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        self.fan_out(event)
+
+    def fan_out(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            if subscription.wants(event):
+                subscription.put(event)
+
+
+class CacheBroker(LocalBroker):
+    """Cross-process fan-out through an event log in the Django cache."""
+
+    SEQUENCE_KEY = 'slot_events:seq'
+    LOG_TIMEOUT = 60
+
+    def __init__(self):
+        super().__init__()
+        self._poller = None
+
+    @classmethod
+    def event_key(cls, sequence):
+        return f'slot_events:{sequence}'
+
+    def publish(self, event):
+        # Local subscribers are reached by this process's own poller.
+        cache.add(self.SEQUENCE_KEY, 0, None)
+        sequence = cache.incr(self.SEQUENCE_KEY)
+        cache.set(self.event_key(sequence), event, self.LOG_TIMEOUT)
+
+    def subscribe(self, doctor_id=None, asynchronous=True):
+        with self._lock:
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='slot-events-poller', daemon=True)
+                self._poller.start()
+        return super().subscribe(doctor_id, asynchronous)
+
+    def _poll(self):
+        last = None
+        while True:
+            try:
+                last = self._catch_up(last)
+            except Exception as e:
+                # The thread is never restarted, so it must outlive cache errors.
+                logger.warning(f"Slot event poll failed: {e}")
+            time.sleep(settings.SLOT_EVENTS_POLL_INTERVAL)
+
+    def _catch_up(self, last):
+        """Fan out events logged after sequence ``last``; returns the new ``last``.
+
+        ``last`` is None on the first poll, which only reads the position.
+        """
+        current = cache.get(self.SEQUENCE_KEY, 0)
+        if last is None:
+            return current
+        if current < last:
+            # The sequence was evicted or reset and numbering started over,
+            # so everything up to ``current`` is new.
+            last = 0
+        if current == last:
+            return last
+        # Cap the catch-up so a long stall cannot fetch the whole log.
+        first = max(last + 1, current - QUEUE_SIZE + 1)
+        events = cache.get_many([self.event_key(seq) for seq in range(first, current + 1)])
+        for seq in range(first, current + 1):
+            event = events.get(self.event_key(seq))
+            if event is not None:
+                self.fan_out(event)
+        return current
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def broker():
+    """The process-wide broker configured by ``SLOT_EVENTS_BROKER``."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                _broker = import_string(settings.SLOT_EVENTS_BROKER)()
+    return _broker
+
+
+def publish_event(event):
+    """Hand ``event`` to the broker when the current transaction commits."""
+    transaction.on_commit(lambda: broker().publish(event))
+
+
+def slot_event(kind, slot):
+    """Event saying ``slot`` was ``booked``, ``freed``, ``created`` or ``deleted``."""
+    return {
+        'type': kind,
+        'slot_id': slot.id,
+        'doctor_id': slot.doctor_id,
+        'starts_at': slot.starts_at.isoformat() if slot.starts_at else None,
+    }
+
+
+def publish_slot_event(kind, slot):
+    """Publish ``slot_event(kind, slot)`` on commit."""
+    publish_event(slot_event(kind, slot))
+
+
+def publish_slots_created(doctor_id, count):
+    """Announce a batch of new slots (bulk inserts do not return ids)."""
+    publish_event({
+        'type': 'created',
+        'slot_id': None,
+        'doctor_id': doctor_id,
+        'starts_at': None,
+        'count': count,
+    })
+
+
+def format_event(kind, data):
+    return f"event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream(doctor_id=None):
+    """Server-sent events for a WSGI response; holds a worker thread."""
+    subscription = broker().subscribe(doctor_id, asynchronous=False)
+    deadline = time.monotonic() + settings.SLOT_EVENTS_MAX_SECONDS
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            event = subscription.get(settings.SLOT_EVENTS_KEEPALIVE)
+            if subscription.overflowed:
+                yield format_event('reset', {})
+                return
+            yield ': keepalive\n\n' if event is None else format_event(event['type'], event)
+    finally:
+        subscription.close()
+
+
+async def astream(doctor_id=None):
+    """Server-sent events for an ASGI response.
+
+    Streams end after ``SLOT_EVENTS_MAX_SECONDS`` and the browser
+    reconnects; Django 4.2 does not notice disconnected clients while
+    streaming, so this bounds how long a dead subscription lingers.
+    """
+    subscription = broker().subscribe(doctor_id, asynchronous=True)
+    deadline = time.monotonic() + settings.SLOT_EVENTS_MAX_SECONDS
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            event = await subscription.get(settings.SLOT_EVENTS_KEEPALIVE)
+            if subscription.overflowed:
+                yield format_event('reset', {})
+                return
+            yield ': keepalive\n\n' if event is None else format_event(event['type'], event)
+    finally:
+        subscription.close()